@@ -1,21 +1,71 @@
+import argparse
+import functools
+import hashlib
+import json
 import psycopg2
 import pandas as pd
 import numpy as np
-import nltk
 import re
+import resource
 import sys
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from sklearn.feature_extraction.text import TfidfVectorizer
-import matplotlib.pyplot as plt
-import seaborn as sns
+import threading
+import time
+from collections import defaultdict, deque
+from itertools import chain
+from psycopg2.extras import execute_values
+from scipy import sparse
 import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from types import SimpleNamespace
+
+# sklearn, NLTK, matplotlib and seaborn take seconds to import, so they are imported
+# inside the stages that use them.
 
 # ------------------------------------------------------------------------
-# 1. NLTK setup (download stopwords/tokenizer if not already present)
+# 1. NLTK setup (resources are looked up locally; nothing is downloaded on import)
 # ------------------------------------------------------------------------
-nltk.download('punkt')
-nltk.download('stopwords')
+NLTK_RESOURCES = {'punkt_tab': 'tokenizers/punkt_tab/english/', 'stopwords': 'corpora/stopwords'}
+BUNDLED_NLTK_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data')
+
+def download_nltk_resources():
+    """Download the NLTK resources into the bundled nltk_data directory next to this script."""
+    import nltk
+    for name in NLTK_RESOURCES:
+        nltk.download(name, download_dir=BUNDLED_NLTK_DATA)
+
+def find_nltk_data(names):
+    """
+    Make sure the named NLTK resources are available. They are looked up in NLTK's usual
+    locations (including $NLTK_DATA) and the bundled nltk_data directory; if any is missing
+    this exits straight away instead of trying the network.
+    """
+    import nltk
+    if BUNDLED_NLTK_DATA not in nltk.data.path:
+        nltk.data.path.append(BUNDLED_NLTK_DATA)
+    missing = []
+    for name in names:
+        try:
+            nltk.data.find(NLTK_RESOURCES[name])
+        except LookupError:
+            missing.append(name)
+    if missing:
+        raise SystemExit(f"Missing NLTK data: {', '.join(missing)}. Run this script once with --download-nltk "
+                         f"(or point NLTK_DATA at a copy of it).")
+
+@functools.lru_cache(maxsize=None)
+def nltk_stop_words():
+    """NLTK's English stopwords as a frozenset, loaded once per process."""
+    find_nltk_data(['stopwords'])
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('english'))
+
+@functools.lru_cache(maxsize=None)
+def nltk_resources():
+    """Returns (word_tokenize, stop_words), loaded once per process."""
+    find_nltk_data(NLTK_RESOURCES)
+    from nltk.tokenize import word_tokenize
+    return word_tokenize, nltk_stop_words()
 
 # ------------------------------------------------------------------------
 # 2. Database connection configuration
@@ -24,6 +74,16 @@ DB_HOST = os.getenv("DB_HOST", "YOUR_HOST")
 DB_NAME = os.getenv("DB_NAME", "YOUR_DATABASE_NAME")
 DB_USER = os.getenv("DB_USER", "YOUR_USERNAME")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "YOUR_PASSWORD")
+CHUNK_SIZE = 10000  # rows per server-side cursor fetch in --stream mode
+STAGES = ('rankings', 'keywords', 'plots', 'csv', 'top-stories')  # report stages after scoring
+ROW_GROUP_SIZE = 100000  # rows per Parquet row group / Arrow record batch
+PREPROCESS_CHUNK_SIZE = 2000  # stories per task sent to a preprocessing worker
+PREPROCESS_VERSION = 2  # bump whenever clean_text/preprocess_text/preprocess_text_fast change their output
+WATERMARK_LAG_MINUTES = 10  # --incremental re-reads pages fetched this long before the last watermark
+INCREMENTAL_LOCK = 7262  # advisory lock key held by an --incremental run
+TIMINGS_FILE = 'pipeline_timings.json'  # per-stage timing summary written by every run
+PROFILE_DIR = 'profiles'  # cProfile output of each stage with --profile
+RSS_SAMPLE_SECONDS = 0.01  # how often a running stage's memory use is sampled
 
 
 def get_db_connection():
@@ -115,178 +175,444 @@ themes = {
 # ------------------------------------------------------------------------
 # 4. Fetch relevant data from the PostgreSQL database
 # ------------------------------------------------------------------------
+# is_charity_appeal and story are generated columns maintained by the search script's schema
+# setup; the two activity fields are constant among the selected rows.
+STORY_QUERY = """
+    SELECT 
+        short_name,
+        'false' AS activityCharityCreated,
+        'CharityAppeal' AS activityType,
+        story
+    FROM crowdfunding
+    WHERE is_charity_appeal;
+"""
+STORY_COLUMNS = ['short_name', 'activitycharitycreated', 'activitytype', 'story']
+
 def fetch_data_from_db():
     """
-    Fetch rows from the 'crowdfunding' table that match:
+    Fetch rows from the 'crowdfunding' table that match (through the is_charity_appeal column):
        details->>'activityCharityCreated' = 'false'
        details->>'activityType' = 'CharityAppeal'
     Returns a pandas DataFrame with columns: short_name, story, activityCharityCreated, activityType.
     """
-    query = """
-        SELECT 
-            short_name,
-            details->>'activityCharityCreated' AS activityCharityCreated,
-            details->>'activityType' AS activityType,
-            details->>'story' AS story
-        FROM crowdfunding
-        WHERE details->>'activityCharityCreated' = 'false'
-          AND details->>'activityType' = 'CharityAppeal';
-    """
     conn = get_db_connection()
     try:
-        df = pd.read_sql(query, conn)
+        df = pd.read_sql(STORY_QUERY, conn)
     finally:
         conn.close()
     return df
 
+# Stories not scored yet by the incremental analysis, among the pages fetched since `since`
+NEW_STORY_QUERY = """
+    SELECT 
+        c.short_name,
+        'false' AS activityCharityCreated,
+        'CharityAppeal' AS activityType,
+        c.story
+    FROM crowdfunding c
+    WHERE c.is_charity_appeal
+      AND (%(since)s::timestamptz IS NULL
+           OR c.fetched_at >= %(since)s::timestamptz - %(lag)s * interval '1 minute')
+      AND NOT EXISTS (SELECT 1 FROM story_scores s WHERE s.short_name = c.short_name);
+"""
+
+def iter_story_chunks(chunk_size=CHUNK_SIZE, query=STORY_QUERY, params=None):
+    """
+    Same rows as fetch_data_from_db (or those of `query`), yielded as DataFrames of at most
+    `chunk_size` rows read through a named (server-side) cursor, so the corpus is never held
+    in memory at once.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor(name='story_stream') as cursor:
+            cursor.itersize = chunk_size
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield pd.DataFrame(rows, columns=STORY_COLUMNS)
+    finally:
+        conn.close()
+
+def fetch_stories(short_names):
+    """Fetch the raw story of each short name, as a dict short_name -> story."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT short_name, story FROM crowdfunding WHERE short_name = ANY(%s)",
+                (list(short_names),)
+            )
+            return dict(cursor.fetchall())
+    finally:
+        conn.close()
+
 # ------------------------------------------------------------------------
 # 5. Clean and preprocess
 # ------------------------------------------------------------------------
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+HTML_ENTITY_RE = re.compile(r'&\w+;')
+URL_RE = re.compile(r'http\S+')
+
 def clean_text(text):
     """
     Removes HTML tags, character entities, URLs, extra spaces, etc.
     """
     if not isinstance(text, str):
         text = str(text) if text is not None else ''
-    # Remove HTML tags
-    text = re.sub(r'<[^>]+>', '', text)
-    # Remove HTML character entities
-    text = re.sub(r'&\w+;', '', text)
-    # Remove URLs
-    text = re.sub(r'http\S+', '', text)
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
-
-stop_words = set(stopwords.words('english'))
+    # Remove HTML tags, then character entities, then URLs. The passes stay separate:
+    # removing one can expose another (e.g. '&am<b>p;'), and merging them would change output.
+    text = HTML_TAG_RE.sub('', text)
+    text = HTML_ENTITY_RE.sub('', text)
+    text = URL_RE.sub('', text)
+    # Collapse whitespace (str.split() splits on exactly the characters r'\s' matches)
+    return ' '.join(text.split())
 
 def preprocess_text(text):
     """
     Tokenize, remove stopwords/punctuation, lowercase, rejoin.
     """
+    word_tokenize, stop_words = nltk_resources()
     tokens = word_tokenize(text.lower())
     tokens = [word for word in tokens if word.isalpha() and word not in stop_words]
     return ' '.join(tokens)
 
-def analyze_keyword_contributions(tfidf_df, keyword_to_categories, feature_names):
+# --tokenizer fast: one regex split instead of word_tokenize. The pattern splits on whitespace
+# and on the characters word_tokenize pads with spaces (quotes, brackets, ; @ # $ % & ? ! *,
+# ':' and ',' unless a digit follows, '..', '--', and a period that ends a word). Anything else
+# stays glued, so a word joined to a digit, hyphen, slash or inner period is dropped by the
+# isalpha() filter just as word_tokenize's token would be. As Punkt does, the period stays on
+# an abbreviation it knows ("mr.", "st.") and on an initial followed by a word ("j. smith"),
+# so those are dropped too. Clitics are cut from the end of a word ("can't" -> "ca", "mum's"
+# -> "mum") and the words word_tokenize splits in two are split.
+FAST_SEPARATORS = r"""[\s"`«»“”‘’„;@#$%&?!*()\[\]{}<>]|[:,](?!\d)|\.\.+|--|''|\.(?=[\s\])}>"'»”’]*$)"""
+FAST_WORD_PERIOD = r"""\.(?=[\s"')\]}])"""
+FAST_LETTER = r'[^\W\d_]'
+FAST_WORD_START = r"""(?<![^\s("`{\[:;&#*@)}\]\-,])"""  # where Punkt starts a word
+FAST_CLITICS = ("n't", "'ll", "'re", "'ve", "'s", "'m", "'d")
+FAST_SPLIT_WORDS = {'cannot': ('can', 'not'), 'gimme': ('gim', 'me'), 'gonna': ('gon', 'na'),
+                    'gotta': ('got', 'ta'), 'lemme': ('lem', 'me'), 'wanna': ('wan', 'na')}
+
+@functools.lru_cache(maxsize=None)
+def punkt_abbreviations():
+    """The abbreviations (without their final period) NLTK's English Punkt model knows."""
+    find_nltk_data(['punkt_tab'])
+    import nltk
+    from nltk.tokenize.punkt import load_punkt_params
+    return frozenset(load_punkt_params(nltk.data.find(NLTK_RESOURCES['punkt_tab'])).abbrev_types)
+
+@functools.lru_cache(maxsize=None)
+def fast_split_re():
     """
-    Analyze how much each keyword contributes to each category's total score.
-    Returns a dictionary mapping categories to keyword contribution dictionaries.
+    The fast tokenizer's split pattern, built once per process. A lookbehind must have a fixed
+    width, so the abbreviations get one guard per length.
     """
-    keyword_contributions = {}
-    
-    # For each category, calculate the total contribution from each keyword
-    for category in set().union(*keyword_to_categories.values()):
-        keyword_contributions[category] = {}
-        
-        # Find all keywords that belong to this category
-        category_keywords = [kw for kw in feature_names if category in keyword_to_categories.get(kw, [])]
-        
-        # Calculate total contribution of each keyword to this category
-        for keyword in category_keywords:
-            # Sum the TF-IDF scores for this keyword across all stories
-            total_contribution = tfidf_df[keyword].sum()
-            keyword_contributions[category][keyword] = total_contribution
-    
-    return keyword_contributions
+    by_length = defaultdict(list)
+    for abbreviation in punkt_abbreviations():
+        if abbreviation.isalpha():
+            by_length[len(abbreviation)].append(re.escape(abbreviation))
+    abbreviation_guards = ''.join(rf"(?<!{FAST_WORD_START}(?:{'|'.join(sorted(words))})\.)"
+                                  for _, words in sorted(by_length.items()))
+    initial_guard = rf"(?:(?<!{FAST_WORD_START}{FAST_LETTER}\.)|(?!\s+{FAST_LETTER}))"
+    return re.compile(f"{FAST_SEPARATORS}|{FAST_WORD_PERIOD}{abbreviation_guards}{initial_guard}")
+
+def preprocess_text_fast(text):
+    """
+    Same as preprocess_text, several times faster, without word_tokenize's sentence
+    splitting; the README lists the rare inputs where the two differ.
+    """
+    stop_words = nltk_stop_words()
+    tokens = []
+    for token in fast_split_re().split(text.lower()):
+        if not token.isalpha():
+            if token.endswith("'"):
+                token = token[:-1]
+            for clitic in FAST_CLITICS:
+                if token.endswith(clitic):
+                    token = token[:-len(clitic)]
+                    break
+            if not token.isalpha():
+                continue
+        for word in FAST_SPLIT_WORDS.get(token, (token,)):
+            if word not in stop_words:
+                tokens.append(word)
+    return ' '.join(tokens)
+
+TOKENIZERS = {'nltk': preprocess_text, 'fast': preprocess_text_fast}
+
+def load_tokenizer(tokenizer):
+    """Load the NLTK data the `tokenizer` needs (exiting if it is missing); returns its preprocess function."""
+    if tokenizer == 'nltk':
+        nltk_resources()
+    else:
+        nltk_stop_words(), fast_split_re()
+    return TOKENIZERS[tokenizer]
+
+def apply_to_chunk(func, texts):
+    return [func(text) for text in texts]
+
+def apply_parallel(func, series, executor=None, chunk_size=None):
+    """
+    Apply `func` to every element of `series`. With a process pool `executor`, chunks of
+    `chunk_size` stories are processed by the workers; results keep the input order and index.
+    """
+    chunk_size = chunk_size or PREPROCESS_CHUNK_SIZE
+    if executor is None or len(series) <= chunk_size:
+        return series.apply(func)
+    values = series.tolist()
+    chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+    results = executor.map(functools.partial(apply_to_chunk, func), chunks)
+    return pd.Series([result for chunk in results for result in chunk], index=series.index, dtype=object)
 
 # ------------------------------------------------------------------------
-# 6. Main analysis function
+# Keyword matching backends (--matcher)
+#   ngram:     CountVectorizer over the 1-3-grams of the preprocessed story
+#   automaton: KeywordMatcher over the tokens of the clean story
 # ------------------------------------------------------------------------
-def main_analysis():
-    # 1) Fetch from DB
-    df = fetch_data_from_db()
-    matching_count = len(df)
-    print(f"\nNumber of rows matched in DB (activityCharityCreated=false, activityType=CharityAppeal): {matching_count}")
+MATCHERS = ('ngram', 'automaton')
+MATCH_TOKEN_RE = re.compile(r'[a-z0-9]+(?:-[a-z0-9]+)*')
 
-    # 2) Basic cleaning of 'story'
-    df['story'] = df['story'].fillna('').astype(str)
-    df['clean_story'] = df['story'].apply(clean_text)
+def match_tokens(text):
+    """Lowercase word tokens, hyphenated words kept whole, stopwords kept."""
+    return MATCH_TOKEN_RE.findall(text.lower())
 
-    # 3) Remove duplicates or empty stories
-    df = df.drop_duplicates(subset='clean_story')
-    df = df[df['clean_story'].str.strip() != '']
-    df['story_id'] = df.index  # assign unique ID
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over the word tokens of the taxonomy keywords, built once.
+    A single pass over a story's tokens finds every keyword occurrence, overlapping ones
+    included, whatever the keyword's length. transform() returns counts in the same
+    layout as CountVectorizer, so they feed the same TF-IDF weighting.
+    """
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self.goto = [{}]   # state -> {token: next state}
+        self.fail = [0]    # state -> longest proper suffix state
+        self.out = [[]]    # state -> indices of the keywords ending here
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for token in match_tokens(keyword):
+                if token not in self.goto[state]:
+                    self.goto[state][token] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = self.goto[state][token]
+            self.out[state].append(index)
 
-    # 4) Preprocess for TF-IDF
-    df['preprocessed_story'] = df['clean_story'].apply(preprocess_text)
+        # Failure links, breadth first (children of the root fail to the root)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(token, 0)
+                self.out[next_state] = self.out[next_state] + self.out[self.fail[next_state]]
 
-    # 5) Prepare all keywords
-    all_keywords = set()
-    keyword_to_categories = {}
-    category_to_theme = {}
+    def match(self, text):
+        """Indices of the keywords found in `text`, once per occurrence."""
+        state, found = 0, []
+        for token in match_tokens(text):
+            while state and token not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(token, 0)
+            found.extend(self.out[state])
+        return found
 
-    for theme, categories in themes.items():
-        for category, keywords in categories.items():
-            for keyword in keywords:
-                all_keywords.add(keyword)
-                if keyword in keyword_to_categories:
-                    keyword_to_categories[keyword].append(category)
-                else:
-                    keyword_to_categories[keyword] = [category]
-            category_to_theme[category] = theme
+    def transform(self, texts, executor=None):
+        """Sparse (stories x keywords) occurrence counts of a Series of clean stories."""
+        matches = apply_parallel(self.match, texts, executor).tolist()
+        indptr = np.cumsum([0] + [len(found) for found in matches])
+        indices = np.fromiter(chain.from_iterable(matches), dtype=np.int64, count=indptr[-1])
+        counts = sparse.csr_matrix((np.ones(len(indices), dtype=np.int64), indices, indptr),
+                                   shape=(len(matches), len(self.keywords)))
+        counts.sum_duplicates()
+        return counts
 
-    all_keywords = list(all_keywords)  # convert to list for TfidfVectorizer
+    def get_feature_names_out(self):
+        return np.asarray(self.keywords, dtype=object)
 
-    # 6) TF-IDF vectorization
-    tfidf_vectorizer = TfidfVectorizer(vocabulary=all_keywords, ngram_range=(1,3))
-    tfidf_matrix = tfidf_vectorizer.fit_transform(df['preprocessed_story'])
-    feature_names = tfidf_vectorizer.get_feature_names_out()
-
-    # 7) Build TF-IDF DataFrame
-    tfidf_df = pd.DataFrame(tfidf_matrix.toarray(), columns=feature_names)
-    tfidf_df['story_id'] = df['story_id']
-
-    # 8) Map keywords -> categories -> themes
-    def map_keywords_to_categories(row):
-        category_scores = {cat: 0 for cat in category_to_theme.keys()}
-        for kw in feature_names:
-            score = row[kw]
-            cats = keyword_to_categories[kw]
-            for c in cats:
-                category_scores[c] += score
-        return category_scores
-
-    tfidf_df['category_scores'] = tfidf_df.apply(map_keywords_to_categories, axis=1)
-
-    def aggregate_category_to_theme_scores(cat_scores):
-        theme_scores = {t: 0 for t in themes.keys()}
-        for cat, sc in cat_scores.items():
-            theme = category_to_theme[cat]
-            theme_scores[theme] += sc
-        return theme_scores
-
-    tfidf_df['theme_scores'] = tfidf_df['category_scores'].apply(aggregate_category_to_theme_scores)
-
-    # 9) Normalize
-    def normalize_scores(scores_dict):
-        total = sum(scores_dict.values())
-        if total > 0:
-            return {k: v / total for k, v in scores_dict.items()}
-        else:
-            return {k: 0 for k in scores_dict.keys()}
+# ------------------------------------------------------------------------
+# Persistent preprocessing cache (--preprocess-cache)
+# ------------------------------------------------------------------------
+def story_hash(story):
+    return hashlib.blake2b(story.encode('utf-8'), digest_size=16).hexdigest()
+
+def ensure_preprocess_cache_table():
+    """
+    Side table holding the clean and preprocessed text of each story. An entry is only
+    reused while its story_hash, preprocess_version and tokenizer still match.
+    """
+    conn = get_db_connection()
+    try:
+        with conn, conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS story_preprocess_cache (
+                    short_name TEXT PRIMARY KEY,
+                    story_hash TEXT NOT NULL,
+                    preprocess_version INTEGER NOT NULL,
+                    clean_story TEXT NOT NULL,
+                    preprocessed_story TEXT NOT NULL
+                );
+            """)
+            cursor.execute("ALTER TABLE story_preprocess_cache "
+                           "ADD COLUMN IF NOT EXISTS tokenizer TEXT NOT NULL DEFAULT 'nltk';")
+    finally:
+        conn.close()
+
+def load_preprocess_cache(short_names, tokenizer='nltk'):
+    """
+    Cached entries of the current PREPROCESS_VERSION made with `tokenizer`,
+    as short_name -> (story_hash, clean, preprocessed).
+    """
+    short_names = list(short_names)
+    cached = {}
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            for i in range(0, len(short_names), CHUNK_SIZE):
+                cursor.execute(
+                    "SELECT short_name, story_hash, clean_story, preprocessed_story FROM story_preprocess_cache "
+                    "WHERE preprocess_version = %s AND tokenizer = %s AND short_name = ANY(%s)",
+                    (PREPROCESS_VERSION, tokenizer, short_names[i:i + CHUNK_SIZE])
+                )
+                cached.update((row[0], row[1:]) for row in cursor.fetchall())
+    finally:
+        conn.close()
+    return cached
+
+def save_preprocess_cache(rows, tokenizer='nltk'):
+    """Upsert (short_name, story_hash, clean_story, preprocessed_story) rows made with `tokenizer`."""
+    if not rows:
+        return
+    conn = get_db_connection()
+    try:
+        with conn, conn.cursor() as cursor:
+            execute_values(cursor, """
+                INSERT INTO story_preprocess_cache
+                    (short_name, story_hash, preprocess_version, tokenizer, clean_story, preprocessed_story)
+                VALUES %s
+                ON CONFLICT (short_name) DO UPDATE SET
+                    story_hash = EXCLUDED.story_hash,
+                    preprocess_version = EXCLUDED.preprocess_version,
+                    tokenizer = EXCLUDED.tokenizer,
+                    clean_story = EXCLUDED.clean_story,
+                    preprocessed_story = EXCLUDED.preprocessed_story
+            """, [(sn, h, PREPROCESS_VERSION, tokenizer, clean, pre) for sn, h, clean, pre in rows], page_size=1000)
+    finally:
+        conn.close()
+
+def preprocess_with_cache(short_names, stories, executor=None, tokenizer='nltk'):
+    """
+    clean_text and the `tokenizer`'s preprocessing of every story, reusing the cached results of
+    stories whose raw text is unchanged. Only new or changed stories are processed (and then cached).
+    Returns (clean_story, preprocessed_story) Series aligned with `stories`.
+    """
+    hashes = stories.map(story_hash)
+    cached = load_preprocess_cache(short_names, tokenizer)
+    hit = pd.Series([cached.get(sn, (None,))[0] == h for sn, h in zip(short_names, hashes)], index=stories.index)
+
+    clean_story = pd.Series([cached[sn][1] if h else None for sn, h in zip(short_names, hit)],
+                            index=stories.index, dtype=object)
+    preprocessed_story = pd.Series([cached[sn][2] if h else None for sn, h in zip(short_names, hit)],
+                                   index=stories.index, dtype=object)
+    if not hit.all():
+        clean_story[~hit] = apply_parallel(clean_text, stories[~hit], executor)
+        preprocessed_story[~hit] = apply_parallel(TOKENIZERS[tokenizer], clean_story[~hit], executor)
+        save_preprocess_cache(list(zip(short_names[~hit.values], hashes[~hit],
+                                       clean_story[~hit], preprocessed_story[~hit])), tokenizer)
+
+    print(f"Preprocessing cache: reused {int(hit.sum())} of {len(hit)} stories, processed {int((~hit).sum())}.")
+    return clean_story, preprocessed_story
+
+def build_incidence_matrices(feature_names, keyword_to_categories, category_to_theme):
+    """
+    Build the sparse keyword -> category incidence matrix (features x categories, counting a
+    keyword once per listing in a category) and the category -> theme matrix.
+    Returns (keyword_category_matrix, category_theme_matrix, category_names, theme_names).
+    """
+    category_names = list(category_to_theme.keys())
+    theme_names = list(dict.fromkeys(category_to_theme.values()))  # themes in taxonomy order
+    category_index = {cat: i for i, cat in enumerate(category_names)}
+    theme_index = {theme: i for i, theme in enumerate(theme_names)}
+
+    rows, cols = [], []
+    for i, kw in enumerate(feature_names):
+        for cat in keyword_to_categories[kw]:
+            rows.append(i)
+            cols.append(category_index[cat])
+    keyword_category_matrix = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, cols)), shape=(len(feature_names), len(category_names))
+    )
+
+    category_theme_matrix = sparse.csr_matrix(
+        (np.ones(len(category_names)),
+         (np.arange(len(category_names)), [theme_index[category_to_theme[c]] for c in category_names])),
+        shape=(len(category_names), len(theme_names))
+    )
+    return keyword_category_matrix, category_theme_matrix, category_names, theme_names
+
+def normalize_rows(scores):
+    """Divide each row by its sum; rows summing to zero stay all-zero."""
+    totals = scores.sum(axis=1, keepdims=True)
+    return np.divide(scores, totals, out=np.zeros_like(scores, dtype=float), where=totals > 0)
 
-    tfidf_df['normalized_category_scores'] = tfidf_df['category_scores'].apply(normalize_scores)
-    tfidf_df['normalized_theme_scores'] = tfidf_df['theme_scores'].apply(normalize_scores)
+def score_stories(tfidf_matrix, keyword_category_matrix, category_theme_matrix):
+    """
+    Category and theme scores of every story as two sparse matrix products, followed by
+    row normalisation. Returns dense (stories x categories) and (stories x themes) arrays.
+    """
+    category_scores = np.asarray((tfidf_matrix @ keyword_category_matrix).todense())
+    theme_scores = category_scores @ category_theme_matrix.toarray()
+    return normalize_rows(category_scores), normalize_rows(theme_scores)
 
-    # 10) Merge back to main df
-    df = df.merge(tfidf_df[['story_id', 'normalized_category_scores', 'normalized_theme_scores']], on='story_id')
+def category_column(category):
+    return f'category_{category}'
 
-    # 11) Analyze & visualize
-    # Category & theme DF
-    normalized_category_scores_df = pd.DataFrame(df['normalized_category_scores'].tolist())
-    normalized_category_scores_df['story_id'] = df['story_id']
+def theme_column(theme):
+    return f'theme_{theme}'
 
-    normalized_theme_scores_df = pd.DataFrame(df['normalized_theme_scores'].tolist())
-    normalized_theme_scores_df['story_id'] = df['story_id']
+def analyze_keyword_contributions(keyword_totals, keyword_category_matrix, feature_names, category_names):
+    """
+    Analyze how much each keyword contributes to each category's total score: the keyword's
+    TF-IDF column sum (`keyword_totals`), placed on every category listing it by the incidence
+    matrix in one sparse operation.
+    Returns a dictionary mapping categories to keyword contribution dictionaries.
+    """
+    contributions = (keyword_category_matrix > 0).astype(float).tocsc()
+    contributions.data = np.asarray(keyword_totals, dtype=float)[contributions.indices]  # indices are keyword rows
 
-    # Averages
-    average_category_weights = normalized_category_scores_df.drop('story_id', axis=1).mean().fillna(0)
-    average_category_weights_sorted = average_category_weights.sort_values(ascending=False)
+    keyword_contributions = {}
+    for j, category in enumerate(category_names):
+        start, end = contributions.indptr[j], contributions.indptr[j + 1]
+        keyword_contributions[category] = dict(zip(
+            (feature_names[i] for i in contributions.indices[start:end]), contributions.data[start:end]
+        ))
+    return keyword_contributions
 
-    average_theme_weights = normalized_theme_scores_df.drop('story_id', axis=1).mean().fillna(0)
-    average_theme_weights_sorted = average_theme_weights.sort_values(ascending=False)
+def top_k_rows(scores, k):
+    """
+    Row indices of the `k` highest positive scores of every column of `scores`, best first
+    (ties keep row order). A partial partition finds the k-th highest score; only the rows
+    scoring at least that much are sorted, so rows tied with it are all considered.
+    """
+    top_rows = []
+    for column in np.asarray(scores).T:
+        candidates = np.flatnonzero(column > 0)
+        if len(candidates) > k > 0:
+            kth_score = -np.partition(-column[candidates], k - 1)[k - 1]
+            candidates = candidates[column[candidates] >= kth_score]
+        top_rows.append(candidates[np.lexsort((candidates, -column[candidates]))[:k]])
+    return top_rows
 
+# ------------------------------------------------------------------------
+# 5b. Reports (shared by the full and the incremental analysis)
+# ------------------------------------------------------------------------
+def report_rankings(average_theme_weights_sorted, average_category_weights_sorted):
+    """Print and save the theme and category rankings, and print the data behind the bar charts."""
     # -----------------------
     # Print ranking in console
     # -----------------------
@@ -323,14 +649,12 @@ def main_analysis():
 
     print("\nRankings saved to 'theme_ranking.txt' and 'category_ranking.txt'.")
 
-    # 12) Keyword contribution analysis
+def report_keyword_contributions(keyword_contributions, category_to_theme, top_keywords=10):
+    """Print the top keywords of every category and save the full tables to keyword_contributions.txt."""
     print("\n" + "="*80)
     print("KEYWORD CONTRIBUTION ANALYSIS")
     print("="*80)
     
-    # Analyze keyword contributions to each category
-    keyword_contributions = analyze_keyword_contributions(tfidf_df, keyword_to_categories, feature_names)
-    
     # Print keyword contribution tables for each category
     for category in category_to_theme.keys():
         print(f"\n--- Keyword Contributions to '{category}' Category ---")
@@ -344,12 +668,12 @@ def main_analysis():
                 print("-" * 60)
                 
                 total_category_contribution = sum(contributions.values())
-                for keyword, contribution in sorted_contributions[:10]:  # Top 10 keywords
+                for keyword, contribution in sorted_contributions[:top_keywords]:  # Top keywords only
                     percentage = (contribution / total_category_contribution * 100) if total_category_contribution > 0 else 0
                     print(f"{keyword:<30} {contribution:<15.4f} {percentage:<15.2f}%")
                 
-                if len(sorted_contributions) > 10:
-                    print(f"... and {len(sorted_contributions) - 10} more keywords")
+                if len(sorted_contributions) > top_keywords:
+                    print(f"... and {len(sorted_contributions) - top_keywords} more keywords")
             else:
                 print("No keywords contributed to this category.")
         else:
@@ -382,36 +706,46 @@ def main_analysis():
     
     print(f"\nKeyword contribution analysis saved to 'keyword_contributions.txt'.")
 
-    # 13) Visualizations
-    if not os.path.exists('plots'):
-        os.makedirs('plots')
+PLOT_FORMATS = ('png', 'svg', 'none')
+PLOT_MANIFEST = 'plots/.rendered.json'  # fingerprint of the data and settings behind each figure file
+
+def render_bar_chart(path, dpi, weights, figsize, color, title):
+    import matplotlib
+    matplotlib.use('Agg')  # never open windows; plt.show() is not called
+    import matplotlib.pyplot as plt
 
-    # Themes bar chart
-    plt.figure(figsize=(10,6), dpi=600)  # 600 DPI for high resolution
-    average_theme_weights_sorted.sort_values(ascending=True).plot(kind='barh', color='skyblue')
+    plt.figure(figsize=figsize, dpi=dpi)
+    weights.sort_values(ascending=True).plot(kind='barh', color=color)
     plt.xlabel('Average Normalized Weight')
-    plt.title('Average Weights of Themes')
+    plt.title(title)
     plt.tight_layout()
-    plt.savefig('plots/theme_weights_bar_chart.png', dpi=600)
-    plt.show()
+    plt.savefig(path, dpi=dpi)
+    plt.close()
 
-    print("Theme weights bar chart saved as 'plots/theme_weights_bar_chart.png'.")
+def render_heatmap(path, dpi, corr, figsize, title):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
-    # Categories bar chart
-    plt.figure(figsize=(10,8), dpi=600)  # 600 DPI for high resolution
-    average_category_weights_sorted.sort_values(ascending=True).plot(kind='barh', color='lightgreen')
-    plt.xlabel('Average Normalized Weight')
-    plt.title('Average Weights of Categories')
+    plt.figure(figsize=figsize, dpi=dpi)
+    sns.heatmap(corr, annot=True, cmap='coolwarm')
+    plt.title(title)
     plt.tight_layout()
-    plt.savefig('plots/category_weights_bar_chart.png', dpi=600)
-    plt.show()
-
-    print("Category weights bar chart saved as 'plots/category_weights_bar_chart.png'.")
+    plt.savefig(path, dpi=dpi)
+    plt.close()
 
-    # Correlation heatmaps
-    corr_cat = normalized_category_scores_df.drop('story_id', axis=1).corr()
-    corr_theme = normalized_theme_scores_df.drop('story_id', axis=1).corr()
+def figure_fingerprint(render, dpi, data, options):
+    payload = json.dumps([render.__name__, dpi, data.to_json(double_precision=15), repr(sorted(options.items()))])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
 
+def render_plots(average_theme_weights_sorted, average_category_weights_sorted, corr_cat, corr_theme,
+                 plot_format='png', dpi=600, plot_workers=4):
+    """
+    Bar charts of the average weights and heatmaps of the correlation tables, saved under plots/
+    as `plot_format` at `dpi`. Figures are rendered with the Agg backend, on up to `plot_workers`
+    processes, and a figure whose data and settings match its previous rendering is not redrawn.
+    """
     # Print correlation data (tables) in console
     print("\nCategory Correlation Table (Data for 'Correlation Between Categories' heatmap):")
     print(corr_cat)
@@ -419,56 +753,838 @@ def main_analysis():
     print("\nTheme Correlation Table (Data for 'Correlation Between Themes' heatmap):")
     print(corr_theme)
 
-    # Category correlation heatmap
-    plt.figure(figsize=(12,10), dpi=600)
-    sns.heatmap(corr_cat, annot=True, cmap='coolwarm')
-    plt.title('Correlation Between Categories')
-    plt.tight_layout()
-    plt.savefig('plots/category_correlation_heatmap.png', dpi=600)
-    plt.show()
-    print("Category correlation heatmap saved as 'plots/category_correlation_heatmap.png'.")
-
-    # Theme correlation heatmap
-    plt.figure(figsize=(8,6), dpi=600)
-    sns.heatmap(corr_theme, annot=True, cmap='coolwarm')
-    plt.title('Correlation Between Themes')
-    plt.tight_layout()
-    plt.savefig('plots/theme_correlation_heatmap.png', dpi=600)
-    plt.show()
-    print("Theme correlation heatmap saved as 'plots/theme_correlation_heatmap.png'.")
+    if plot_format == 'none':
+        return
+    if not os.path.exists('plots'):
+        os.makedirs('plots')
 
-    # 14) Save final DataFrame
-    df.to_csv('stories_with_theme_and_category_weights.csv', index=False)
-    print("\nResults saved to 'stories_with_theme_and_category_weights.csv'.")
+    figures = [  # (file name, description, renderer, data, options)
+        ('theme_weights_bar_chart', 'Theme weights bar chart', render_bar_chart, average_theme_weights_sorted,
+         {'figsize': (10,6), 'color': 'skyblue', 'title': 'Average Weights of Themes'}),
+        ('category_weights_bar_chart', 'Category weights bar chart', render_bar_chart, average_category_weights_sorted,
+         {'figsize': (10,8), 'color': 'lightgreen', 'title': 'Average Weights of Categories'}),
+        ('category_correlation_heatmap', 'Category correlation heatmap', render_heatmap, corr_cat,
+         {'figsize': (12,10), 'title': 'Correlation Between Categories'}),
+        ('theme_correlation_heatmap', 'Theme correlation heatmap', render_heatmap, corr_theme,
+         {'figsize': (8,6), 'title': 'Correlation Between Themes'}),
+    ]
+    try:
+        with open(PLOT_MANIFEST) as f:
+            rendered = json.load(f)
+    except (OSError, ValueError):
+        rendered = {}
 
-    # 15) Top 2 stories per category
-    if not os.path.exists('top_stories_by_category'):
-        os.makedirs('top_stories_by_category')
+    pending = []
+    for name, description, render, data, options in figures:
+        path = f'plots/{name}.{plot_format}'
+        fingerprint = figure_fingerprint(render, dpi, data, options)
+        if rendered.get(path) == fingerprint and os.path.exists(path):
+            print(f"{description} unchanged, kept '{path}'.")
+        else:
+            pending.append((path, description, fingerprint, render, data, options))
 
-    for category in category_to_theme.keys():
-        # Stories that have a non-zero score for this category
-        stories_with_cat = df[df['normalized_category_scores'].apply(lambda x: x[category] > 0)]
-        if stories_with_cat.empty:
-            continue
+    plot_workers = min(plot_workers, len(pending), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=plot_workers) if plot_workers > 1 else nullcontext() as executor:
+        if executor:
+            futures = [executor.submit(render, path, dpi, data, **options)
+                       for path, _, _, render, data, options in pending]
+        for n, (path, description, fingerprint, render, data, options) in enumerate(pending):
+            if executor:
+                futures[n].result()
+            else:
+                render(path, dpi, data, **options)
+            rendered[path] = fingerprint
+            print(f"{description} saved as '{path}'.")
+
+    with open(PLOT_MANIFEST, 'w') as f:
+        json.dump(rendered, f, indent=2, sort_keys=True)
 
-        # Add the category score as a column
-        stories_with_cat = stories_with_cat.copy()
-        stories_with_cat['category_score'] = stories_with_cat['normalized_category_scores'].apply(lambda x: x[category])
+OUTPUT_FORMATS = ('csv', 'parquet', 'arrow')
+PYARROW_REQUIREMENT = 'pyarrow==17.0.0'  # optional; a release that works with the pinned numpy 1.26
+RESULTS_FILE = 'stories_with_theme_and_category_weights'
+TEXT_COLUMNS = ('story', 'clean_story', 'preprocessed_story')
 
-        # Sort descending
-        stories_with_cat = stories_with_cat.sort_values('category_score', ascending=False)
+def write_columnar(df, path, output_format, text_columns=False, row_group_size=ROW_GROUP_SIZE):
+    """
+    Write the per-story scores of `df` to Parquet or an Arrow IPC file as flat typed columns:
+    short_name, story_id (when present), one float64 column per category and per theme, and
+    the text columns only if `text_columns`. Rows are written `row_group_size` at a time.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        if e.name == 'pyarrow':
+            raise SystemExit(f"--output-format {output_format} needs pyarrow (pip install '{PYARROW_REQUIREMENT}').")
+        raise SystemExit(f"--output-format {output_format}: pyarrow is installed but failed to import ({e}). "
+                         f"A pyarrow built for another numpy is the usual cause; pip install '{PYARROW_REQUIREMENT}'.")
 
-        # Top 2
-        top_stories = stories_with_cat.head(2)
+    fields = [pa.field('short_name', pa.string())]
+    if 'story_id' in df:
+        fields.append(pa.field('story_id', pa.int64()))
+    fields += [pa.field(column, pa.float64()) for column in df.columns if column.startswith(('category_', 'theme_'))]
+    if text_columns:
+        fields += [pa.field(column, pa.string()) for column in TEXT_COLUMNS if column in df]
+    schema = pa.schema(fields)
 
+    writer = pq.ParquetWriter(path, schema) if output_format == 'parquet' else pa.ipc.new_file(path, schema)
+    try:
+        for start in range(0, len(df), row_group_size):
+            batch = pa.RecordBatch.from_pandas(df.iloc[start:start + row_group_size][schema.names],
+                                               schema=schema, preserve_index=False)
+            if output_format == 'parquet':
+                writer.write_table(pa.Table.from_batches([batch]))  # one row group per batch
+            else:
+                writer.write_batch(batch)
+    finally:
+        writer.close()
+
+def save_results(df, output_format='csv', text_columns=False):
+    """Step 14: the per-story results as CSV (every column) or as a columnar file."""
+    path = f'{RESULTS_FILE}.{output_format}'
+    if output_format == 'csv':
+        df.to_csv(path, index=False)
+    else:
+        write_columnar(df, path, output_format, text_columns)
+    return path
+
+def save_top_stories(top_story_texts_by_category, top_stories=2):
+    """Write the texts of the top stories of each category (a dict category -> Series of texts)."""
+    if not os.path.exists('top_stories_by_category'):
+        os.makedirs('top_stories_by_category')
+
+    for category, top_story_texts in top_story_texts_by_category.items():
         safe_cat_name = re.sub(r'[\\/*?:"<>|]', "_", category)
         file_path = f'top_stories_by_category/{safe_cat_name}_top_stories.txt'
-        top_stories['story'].to_csv(file_path, index=False, header=False)
+        top_story_texts.to_csv(file_path, index=False, header=False)
+
+    print(f"Top {top_stories} stories for each category saved in 'top_stories_by_category' directory.")
+
+# ------------------------------------------------------------------------
+# 5c. Pipeline stage instrumentation
+# ------------------------------------------------------------------------
+def current_rss_mb():
+    """Resident memory of this process in MB (the high-water mark where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+class PipelineTimer:
+    """
+    Named stages of an analysis run. `with pipeline_timer.stage(name, rows_in) as stage:` records
+    the wall time, CPU time and peak resident memory of this process while the block runs, and the
+    rows it passed on (`stage.rows_out`). A stage entered once per chunk accumulates over its calls.
+    With `profile`, each stage also runs under its own cProfile profiler. Work done in worker
+    processes is not attributed to stages; their total CPU time is reported separately.
+    """
+    def __init__(self):
+        self.start()
+
+    def start(self, mode='full', profile=False):
+        self.mode = mode
+        self.records = {}
+        self.profiles = {} if profile else None
+        self.started = time.perf_counter()
+        self.started_cpu = time.process_time()
+        self.started_children_cpu = self.children_cpu()
+
+    @staticmethod
+    def children_cpu():
+        times = os.times()
+        return times.children_user + times.children_system
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        record = self.records.setdefault(name, {
+            'stage': name, 'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+            'peak_rss_mb': 0.0, 'rows_in': None, 'rows_out': None,
+        })
+        stage = SimpleNamespace(rows_out=None, peak_rss_mb=current_rss_mb())
+        stop = threading.Event()
+        sampler = threading.Thread(target=self.sample_rss, args=(stage, stop), daemon=True)
+        sampler.start()
+        profiler = None
+        if self.profiles is not None:
+            import cProfile
+            profiler = self.profiles.setdefault(name, cProfile.Profile())
+            profiler.enable()
+        started, started_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield stage
+        finally:
+            record['wall_seconds'] += time.perf_counter() - started
+            record['cpu_seconds'] += time.process_time() - started_cpu
+            if profiler:
+                profiler.disable()
+            stop.set()
+            sampler.join()
+            record['calls'] += 1
+            record['peak_rss_mb'] = max(record['peak_rss_mb'], stage.peak_rss_mb, current_rss_mb())
+            if rows_in is not None:
+                record['rows_in'] = (record['rows_in'] or 0) + rows_in
+            if stage.rows_out is not None:
+                record['rows_out'] = (record['rows_out'] or 0) + stage.rows_out
+
+    @staticmethod
+    def sample_rss(stage, stop):
+        while not stop.wait(RSS_SAMPLE_SECONDS):
+            stage.peak_rss_mb = max(stage.peak_rss_mb, current_rss_mb())
+
+    def iterate(self, name, chunks):
+        """Yield the items of `chunks`, timing the production of each one as a call of stage `name`."""
+        chunks = iter(chunks)
+        while True:
+            with self.stage(name) as stage:
+                chunk = next(chunks, None)
+                stage.rows_out = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                return
+            yield chunk
+
+    def summary(self):
+        return {
+            'mode': self.mode,
+            'wall_seconds': time.perf_counter() - self.started,
+            'cpu_seconds': time.process_time() - self.started_cpu,
+            'worker_cpu_seconds': self.children_cpu() - self.started_children_cpu,
+            'peak_rss_mb': max([resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024]
+                               + [r['peak_rss_mb'] for r in self.records.values()]),
+            'stages': list(self.records.values()),
+            'profiles': {name: os.path.join(PROFILE_DIR, f'{name}.prof') for name in self.profiles or {}},
+        }
+
+    def report(self, path=TIMINGS_FILE):
+        """Print the per-stage table, write the summary to `path` and the profiles to PROFILE_DIR."""
+        summary = self.summary()
+        print("\nPipeline stages:")
+        print(f"{'stage':<18}{'calls':>6}{'wall s':>10}{'cpu s':>10}{'peak MB':>10}{'rows in':>10}{'rows out':>10}")
+        for r in summary['stages']:
+            rows_in = '' if r['rows_in'] is None else r['rows_in']
+            rows_out = '' if r['rows_out'] is None else r['rows_out']
+            print(f"{r['stage']:<18}{r['calls']:>6}{r['wall_seconds']:>10.3f}{r['cpu_seconds']:>10.3f}"
+                  f"{r['peak_rss_mb']:>10.0f}{rows_in:>10}{rows_out:>10}")
+        print(f"{'total':<18}{'':>6}{summary['wall_seconds']:>10.3f}{summary['cpu_seconds']:>10.3f}"
+              f"{summary['peak_rss_mb']:>10.0f}   (workers: {summary['worker_cpu_seconds']:.3f} cpu s)")
+
+        with open(path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Timing summary saved to '{path}'.")
+        if self.profiles:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            for name, profiler in self.profiles.items():
+                profiler.dump_stats(summary['profiles'][name])
+            print(f"Stage profiles saved to '{PROFILE_DIR}/' (view with: python -m pstats {PROFILE_DIR}/<stage>.prof).")
+
+pipeline_timer = PipelineTimer()
+
+# ------------------------------------------------------------------------
+# 6. Main analysis function
+# ------------------------------------------------------------------------
+def build_keyword_maps(taxonomy=None):
+    """
+    Flatten `themes` (or another taxonomy of the same shape) into the keyword list and the
+    keyword -> categories and category -> theme maps. A keyword listed twice in a category
+    appears twice in its list.
+    """
+    all_keywords = set()
+    keyword_to_categories = {}
+    category_to_theme = {}
+
+    for theme, categories in (taxonomy or themes).items():
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                all_keywords.add(keyword)
+                if keyword in keyword_to_categories:
+                    keyword_to_categories[keyword].append(category)
+                else:
+                    keyword_to_categories[keyword] = [category]
+            category_to_theme[category] = theme
+
+    all_keywords = list(all_keywords)  # convert to list for TfidfVectorizer
+    return all_keywords, keyword_to_categories, category_to_theme
+
+def vectorize_corpus(all_keywords, executor=None, use_cache=False, matcher='ngram', tokenizer='nltk'):
+    """
+    Steps 1-6 of the analysis on the full corpus in memory, text preprocessing spread
+    over `executor` if given (and served from the preprocessing cache if `use_cache`).
+    Keywords are counted by the `matcher` backend ('automaton' skips step 4) in stories
+    preprocessed by the `tokenizer` path.
+    Returns (df, tfidf_matrix, feature_names), with tfidf_matrix rows in df order.
+    """
+    from sklearn.feature_extraction.text import TfidfTransformer, TfidfVectorizer
+
+    # 1) Fetch from DB
+    with pipeline_timer.stage('fetch') as stage:
+        df = fetch_data_from_db()
+        stage.rows_out = len(df)
+    matching_count = len(df)
+    print(f"\nNumber of rows matched in DB (activityCharityCreated=false, activityType=CharityAppeal): {matching_count}")
+
+    # 2) Basic cleaning of 'story' (and 4) preprocessing, when served from the cache)
+    with pipeline_timer.stage('clean', rows_in=len(df)) as stage:
+        df['story'] = df['story'].fillna('').astype(str)
+        if use_cache:
+            df['clean_story'], preprocessed_story = preprocess_with_cache(df['short_name'], df['story'], executor,
+                                                                          tokenizer)
+        else:
+            df['clean_story'] = apply_parallel(clean_text, df['story'], executor)
+        stage.rows_out = len(df)
+
+    # 3) Remove duplicates or empty stories
+    with pipeline_timer.stage('dedupe', rows_in=len(df)) as stage:
+        df = df.drop_duplicates(subset='clean_story')
+        df = df[df['clean_story'].str.strip() != '']
+        df['story_id'] = df.index  # assign unique ID
+        stage.rows_out = len(df)
+
+    if matcher == 'automaton':
+        # 5-6) Count every keyword occurrence in the clean stories, then TF-IDF weighting
+        with pipeline_timer.stage('vectorize', rows_in=len(df)) as stage:
+            keyword_matcher = KeywordMatcher(all_keywords)
+            tfidf_matrix = TfidfTransformer().fit_transform(keyword_matcher.transform(df['clean_story'], executor))
+            stage.rows_out = tfidf_matrix.shape[0]
+        return df, tfidf_matrix, keyword_matcher.get_feature_names_out()
+
+    # 4) Preprocess for TF-IDF
+    if use_cache:
+        df['preprocessed_story'] = preprocessed_story  # aligned on the index
+    else:
+        with pipeline_timer.stage('preprocess', rows_in=len(df)) as stage:
+            df['preprocessed_story'] = apply_parallel(TOKENIZERS[tokenizer], df['clean_story'], executor)
+            stage.rows_out = len(df)
+
+    # 6) TF-IDF vectorization
+    with pipeline_timer.stage('vectorize', rows_in=len(df)) as stage:
+        tfidf_vectorizer = TfidfVectorizer(vocabulary=all_keywords, ngram_range=(1,3))
+        tfidf_matrix = tfidf_vectorizer.fit_transform(df['preprocessed_story'])
+        feature_names = tfidf_vectorizer.get_feature_names_out()
+        stage.rows_out = tfidf_matrix.shape[0]
+    return df, tfidf_matrix, feature_names
+
+def vectorize_corpus_streaming(all_keywords, chunk_size=CHUNK_SIZE, executor=None, use_cache=False, matcher='ngram',
+                               tokenizer='nltk'):
+    """
+    Streaming version of vectorize_corpus: stories are read, cleaned, de-duplicated and
+    tokenized one chunk at a time, and only their sparse keyword counts are kept. IDF
+    weighting is applied once all chunks are counted, which gives the same matrix as
+    TfidfVectorizer on the whole corpus. The returned df holds only short_name and story_id.
+    """
+    from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+
+    count_vectorizer = CountVectorizer(vocabulary=all_keywords, ngram_range=(1,3))
+    keyword_matcher = KeywordMatcher(all_keywords) if matcher == 'automaton' else None
+    seen_stories = set()  # 8-byte digests of the clean stories kept so far
+    counts, frames = [], []
+    matching_count = 0
+
+    for chunk in pipeline_timer.iterate('fetch', iter_story_chunks(chunk_size)):
+        chunk.index = pd.RangeIndex(matching_count, matching_count + len(chunk))
+        matching_count += len(chunk)
+
+        # 2) Basic cleaning, 3) remove duplicates (across all chunks) or empty stories
+        with pipeline_timer.stage('clean', rows_in=len(chunk)) as stage:
+            stories = chunk['story'].fillna('').astype(str)
+            if use_cache:
+                clean_story, preprocessed_story = preprocess_with_cache(chunk['short_name'], stories, executor,
+                                                                        tokenizer)
+            else:
+                clean_story = apply_parallel(clean_text, stories, executor)
+            stage.rows_out = len(clean_story)
+        with pipeline_timer.stage('dedupe', rows_in=len(chunk)) as stage:
+            digests = clean_story.map(lambda text: hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest())
+            keep = ~digests.duplicated() & ~digests.isin(seen_stories) & (clean_story.str.strip() != '')
+            seen_stories.update(digests[~digests.duplicated()])
+            stage.rows_out = int(keep.sum())
+
+        # 4) Preprocess and count the taxonomy keywords of this chunk
+        if not keyword_matcher and not use_cache:
+            with pipeline_timer.stage('preprocess', rows_in=int(keep.sum())) as stage:
+                preprocessed_story = apply_parallel(TOKENIZERS[tokenizer], clean_story[keep], executor)
+                stage.rows_out = len(preprocessed_story)
+        elif not keyword_matcher:
+            preprocessed_story = preprocessed_story[keep]
+        with pipeline_timer.stage('vectorize', rows_in=int(keep.sum())) as stage:
+            if keyword_matcher:
+                counts.append(keyword_matcher.transform(clean_story[keep], executor))
+            else:
+                counts.append(count_vectorizer.transform(preprocessed_story))
+            stage.rows_out = counts[-1].shape[0]
+        frames.append(pd.DataFrame({'short_name': chunk.loc[keep, 'short_name'], 'story_id': chunk.index[keep]},
+                                   index=chunk.index[keep]))
+
+    print(f"\nNumber of rows matched in DB (activityCharityCreated=false, activityType=CharityAppeal): {matching_count}")
+
+    # 6) TF-IDF weighting over the whole corpus
+    feature_names = (keyword_matcher or count_vectorizer).get_feature_names_out()
+    if not frames:
+        return pd.DataFrame(columns=['short_name', 'story_id']), sparse.csr_matrix((0, len(feature_names))), feature_names
+    with pipeline_timer.stage('vectorize') as stage:
+        df = pd.concat(frames)
+        tfidf_matrix = TfidfTransformer().fit_transform(sparse.vstack(counts).tocsr())
+    return df, tfidf_matrix, feature_names
+
+def save_story_scorer(path, doc_freq, n_docs, feature_names, matcher, tokenizer='nltk'):
+    """Freeze the vocabulary and document frequencies of the analysed corpus into a StoryScorer model."""
+    from story_scorer import StoryScorer
+    StoryScorer(feature_names, doc_freq, n_docs, matcher, tokenizer=tokenizer).save(path)
+    print(f"Story scorer model saved to '{path}'.")
+
+def main_analysis(stream=False, chunk_size=CHUNK_SIZE, workers=1, preprocess_cache=False, matcher='ngram',
+                  stages=STAGES, save_scorer=None, plot_format='png', dpi=600, plot_workers=4,
+                  top_keywords=10, top_stories=2, output_format='csv', text_columns=False, profile=False,
+                  tokenizer='nltk'):
+    pipeline_timer.start('stream' if stream else 'full', profile)
+
+    # 5) Prepare all keywords
+    all_keywords, keyword_to_categories, category_to_theme = build_keyword_maps()
+    if matcher == 'ngram' or preprocess_cache:
+        load_tokenizer(tokenizer)  # fail before touching the database if the NLTK data is missing
+    if preprocess_cache:
+        ensure_preprocess_cache_table()
+
+    # 1-4) Fetch, clean, de-duplicate and preprocess (on `workers` processes); 6) TF-IDF vectorization
+    with ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext() as executor:
+        if stream:
+            df, tfidf_matrix, feature_names = vectorize_corpus_streaming(
+                all_keywords, chunk_size, executor, use_cache=preprocess_cache, matcher=matcher, tokenizer=tokenizer
+            )
+        else:
+            df, tfidf_matrix, feature_names = vectorize_corpus(
+                all_keywords, executor, use_cache=preprocess_cache, matcher=matcher, tokenizer=tokenizer
+            )
+
+    if save_scorer:
+        with pipeline_timer.stage('save-scorer'):
+            save_story_scorer(save_scorer, tfidf_matrix.getnnz(axis=0), tfidf_matrix.shape[0], feature_names, matcher,
+                              tokenizer)
+
+    with pipeline_timer.stage('score', rows_in=tfidf_matrix.shape[0]) as stage:
+        # 7) Build keyword -> category -> theme incidence matrices
+        keyword_category_matrix, category_theme_matrix, category_names, theme_names = build_incidence_matrices(
+            feature_names, keyword_to_categories, category_to_theme
+        )
+
+        # 8) Score stories (sparse products) and 9) normalize per story
+        normalized_category_scores, normalized_theme_scores = score_stories(
+            tfidf_matrix, keyword_category_matrix, category_theme_matrix
+        )
+        stage.rows_out = len(normalized_category_scores)
+
+    with pipeline_timer.stage('aggregate', rows_in=len(df)) as stage:
+        # 10) Attach the scores to the main df as numeric columns (rows are in tfidf_matrix order)
+        normalized_category_scores_df = pd.DataFrame(normalized_category_scores, columns=category_names, index=df.index)
+        normalized_theme_scores_df = pd.DataFrame(normalized_theme_scores, columns=theme_names, index=df.index)
+        df = pd.concat([
+            df,
+            normalized_category_scores_df.rename(columns=category_column),
+            normalized_theme_scores_df.rename(columns=theme_column),
+        ], axis=1)
+
+        # 11) Analyze & visualize
+        # Category & theme DF
+        normalized_category_scores_df['story_id'] = df['story_id']
+        normalized_theme_scores_df['story_id'] = df['story_id']
+
+        # Averages
+        average_category_weights = normalized_category_scores_df.drop('story_id', axis=1).mean().fillna(0)
+        average_category_weights_sorted = average_category_weights.sort_values(ascending=False)
+
+        average_theme_weights = normalized_theme_scores_df.drop('story_id', axis=1).mean().fillna(0)
+        average_theme_weights_sorted = average_theme_weights.sort_values(ascending=False)
+        stage.rows_out = len(df)
+
+    if 'rankings' in stages:
+        with pipeline_timer.stage('rankings'):
+            report_rankings(average_theme_weights_sorted, average_category_weights_sorted)
+
+    # 12) Keyword contribution analysis
+    if 'keywords' in stages:
+        with pipeline_timer.stage('keywords'):
+            keyword_totals = np.asarray(tfidf_matrix.sum(axis=0)).ravel()  # every keyword's TF-IDF over all stories
+            keyword_contributions = analyze_keyword_contributions(
+                keyword_totals, keyword_category_matrix, feature_names, category_names
+            )
+            report_keyword_contributions(keyword_contributions, category_to_theme, top_keywords)
+
+    # 13) Visualizations
+    if 'plots' in stages:
+        with pipeline_timer.stage('plots'):
+            corr_cat = normalized_category_scores_df.drop('story_id', axis=1).corr()
+            corr_theme = normalized_theme_scores_df.drop('story_id', axis=1).corr()
+            render_plots(average_theme_weights_sorted, average_category_weights_sorted, corr_cat, corr_theme,
+                         plot_format, dpi, plot_workers)
+
+    # 14) Save final DataFrame
+    if 'csv' in stages:
+        with pipeline_timer.stage('csv', rows_in=len(df)) as stage:
+            path = save_results(df, output_format, text_columns)
+            stage.rows_out = len(df)
+        print(f"\nResults saved to '{path}'.")
+
+    # 15) Top stories per category (positive scores only)
+    if 'top-stories' in stages:
+        with pipeline_timer.stage('top-stories') as stage:
+            top_story_texts_by_category = {}
+            for category, rows in zip(category_names, top_k_rows(normalized_category_scores, top_stories)):
+                if len(rows) == 0:
+                    continue
+                best_stories = df.iloc[rows]
+                if 'story' in best_stories:
+                    top_story_texts_by_category[category] = best_stories['story']
+                else:
+                    # Streaming mode keeps no text; fetch just these stories
+                    top_story_texts_by_category[category] = best_stories['short_name'].map(fetch_stories(best_stories['short_name']))
+            save_top_stories(top_story_texts_by_category, top_stories)
+            stage.rows_out = sum(len(texts) for texts in top_story_texts_by_category.values())
+
+    pipeline_timer.report()
 
-    print("Top 2 stories for each category saved in 'top_stories_by_category' directory.")
+# ------------------------------------------------------------------------
+# 6c. Incremental analysis (--incremental)
+# ------------------------------------------------------------------------
+def ensure_incremental_tables(conn, rebuild=False):
+    """
+    story_scores holds the normalized scores of every story scored so far (arrays in the
+    category/theme order of the state), analysis_state the running sufficient statistics
+    and the watermark. `rebuild` drops both, so the next run scores the whole corpus again.
+    """
+    with conn, conn.cursor() as cursor:
+        if rebuild:
+            cursor.execute("DROP TABLE IF EXISTS story_scores, analysis_state;")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS story_scores (
+                short_name TEXT PRIMARY KEY,
+                story_id BIGSERIAL,
+                story_digest TEXT NOT NULL,
+                category_scores DOUBLE PRECISION[] NOT NULL,
+                theme_scores DOUBLE PRECISION[] NOT NULL,
+                scored_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            );
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS story_scores_digest_idx ON story_scores (story_digest);")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_state (
+                name TEXT PRIMARY KEY,
+                watermark TIMESTAMPTZ,
+                state JSONB NOT NULL
+            );
+        """)
+
+def new_analysis_state(feature_names, category_names, theme_names, matcher, tokenizer='nltk'):
+    """Sufficient statistics of an empty corpus."""
+    n_features, n_categories, n_themes = len(feature_names), len(category_names), len(theme_names)
+    return {
+        'matcher': matcher,
+        'tokenizer': tokenizer,
+        'feature_names': list(feature_names),
+        'category_names': list(category_names),
+        'theme_names': list(theme_names),
+        'n': 0,
+        'doc_freq': [0] * n_features,
+        'keyword_totals': [0.0] * n_features,
+        'category_sum': [0.0] * n_categories,
+        'category_cross': [[0.0] * n_categories for _ in range(n_categories)],
+        'theme_sum': [0.0] * n_themes,
+        'theme_cross': [[0.0] * n_themes for _ in range(n_themes)],
+    }
+
+def load_analysis_state(conn):
+    """Returns (watermark, state), or (None, None) before the first incremental run."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT watermark, state FROM analysis_state WHERE name = 'default'")
+        row = cursor.fetchone()
+    return (row[0], row[1]) if row else (None, None)
+
+def known_story_digests(conn, digests):
+    """The subset of `digests` that already belongs to a scored story."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT story_digest FROM story_scores WHERE story_digest = ANY(%s)", (list(digests),))
+        return {row[0] for row in cursor.fetchall()}
+
+def fold_in(state, counts, category_scores, theme_scores, tfidf_matrix):
+    """Add the statistics of newly scored stories to `state`, in place."""
+    state['n'] += counts.shape[0]
+    state['doc_freq'] = (np.array(state['doc_freq']) + counts.getnnz(axis=0)).tolist()
+    state['keyword_totals'] = (np.array(state['keyword_totals']) + np.asarray(tfidf_matrix.sum(axis=0)).ravel()).tolist()
+    for name, scores in (('category', category_scores), ('theme', theme_scores)):
+        state[f'{name}_sum'] = (np.array(state[f'{name}_sum']) + scores.sum(axis=0)).tolist()
+        state[f'{name}_cross'] = (np.array(state[f'{name}_cross']) + scores.T @ scores).tolist()
+
+def correlation_from_sums(n, sums, cross, names):
+    """Pearson correlation matrix from the count, column sums and cross-product sums (NaN for constant columns)."""
+    sums, cross = np.array(sums), np.array(cross)
+    covariance = cross - np.outer(sums, sums) / n if n else np.zeros_like(cross)
+    scale = np.sqrt(np.outer(np.diag(covariance), np.diag(covariance)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = np.where(scale > 0, covariance / scale, np.nan)
+    return pd.DataFrame(corr, index=names, columns=names)
+
+def top_scored_stories(conn, category_position, limit=2):
+    """short_names of the highest scoring stories of a category (1-based position in category_scores)."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT short_name FROM story_scores
+            WHERE category_scores[%(i)s] > 0
+            ORDER BY category_scores[%(i)s] DESC
+            LIMIT %(limit)s
+        """, {'i': category_position, 'limit': limit})
+        return [row[0] for row in cursor.fetchall()]
+
+def incremental_analysis(chunk_size=CHUNK_SIZE, workers=1, preprocess_cache=False, rebuild=False, matcher='ngram',
+                         stages=STAGES, save_scorer=None, plot_format='png', dpi=600, plot_workers=4,
+                         top_keywords=10, top_stories=2, output_format='csv', text_columns=False, profile=False,
+                         tokenizer='nltk'):
+    """
+    Score only the stories fetched since the last watermark that have not been scored yet,
+    fold them into the running statistics kept in analysis_state, and publish the rankings,
+    keyword contributions, plots and top stories from those statistics.
+
+    New stories are weighted with the IDF of the corpus seen so far; the scores of stories
+    already stored are not revisited (use --rebuild to rescore everything).
+    """
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.preprocessing import normalize
+
+    pipeline_timer.start('incremental', profile)
+    all_keywords, keyword_to_categories, category_to_theme = build_keyword_maps()
+    if matcher == 'ngram' or preprocess_cache:
+        load_tokenizer(tokenizer)
+    if preprocess_cache:
+        ensure_preprocess_cache_table()
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (INCREMENTAL_LOCK,))
+            if not cursor.fetchone()[0]:
+                print("Another incremental analysis is running; exiting.")
+                return
+        ensure_incremental_tables(conn, rebuild)
+        watermark, state = load_analysis_state(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT now()")
+            run_started = cursor.fetchone()[0]
+        conn.commit()
+
+        # The stored state fixes the feature order; a changed taxonomy, matcher or tokenizer needs a rebuild
+        if state is None:
+            feature_names = sorted(all_keywords)
+        elif (set(state['feature_names']) == set(all_keywords) and state['category_names'] == list(category_to_theme)
+              and state.get('matcher', 'ngram') == matcher and state.get('tokenizer', 'nltk') == tokenizer):
+            feature_names = state['feature_names']
+        else:
+            raise SystemExit("The keyword taxonomy, matcher or tokenizer changed since the last incremental run; "
+                             "run again with --rebuild.")
+        count_vectorizer = CountVectorizer(vocabulary=feature_names, ngram_range=(1,3))
+        keyword_matcher = KeywordMatcher(feature_names) if matcher == 'automaton' else None
+        keyword_category_matrix, category_theme_matrix, category_names, theme_names = build_incidence_matrices(
+            feature_names, keyword_to_categories, category_to_theme
+        )
+        if state is None:
+            state = new_analysis_state(feature_names, category_names, theme_names, matcher, tokenizer)
+
+        # 1-4) Read, clean, de-duplicate (against the stored stories too) and count the new stories
+        seen_stories = set()
+        counts, frames = [], []
+        matching_count = 0
+        with ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext() as executor:
+            new_chunks = iter_story_chunks(chunk_size, NEW_STORY_QUERY, {'since': watermark, 'lag': WATERMARK_LAG_MINUTES})
+            for chunk in pipeline_timer.iterate('fetch', new_chunks):
+                matching_count += len(chunk)
+                with pipeline_timer.stage('clean', rows_in=len(chunk)) as stage:
+                    stories = chunk['story'].fillna('').astype(str)
+                    if preprocess_cache:
+                        clean_story, preprocessed_story = preprocess_with_cache(chunk['short_name'], stories, executor,
+                                                                                tokenizer)
+                    else:
+                        clean_story = apply_parallel(clean_text, stories, executor)
+                    stage.rows_out = len(clean_story)
+                with pipeline_timer.stage('dedupe', rows_in=len(chunk)) as stage:
+                    digests = clean_story.map(lambda text: hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest())
+                    known = seen_stories | known_story_digests(conn, digests.unique())
+                    keep = ~digests.duplicated() & ~digests.isin(known) & (clean_story.str.strip() != '')
+                    seen_stories.update(digests[keep])
+                    stage.rows_out = int(keep.sum())
+
+                if not keyword_matcher and not preprocess_cache:
+                    with pipeline_timer.stage('preprocess', rows_in=int(keep.sum())) as stage:
+                        preprocessed_story = apply_parallel(TOKENIZERS[tokenizer], clean_story[keep], executor)
+                        stage.rows_out = len(preprocessed_story)
+                elif not keyword_matcher:
+                    preprocessed_story = preprocessed_story[keep]
+                with pipeline_timer.stage('vectorize', rows_in=int(keep.sum())) as stage:
+                    if keyword_matcher:
+                        counts.append(keyword_matcher.transform(clean_story[keep], executor))
+                    else:
+                        counts.append(count_vectorizer.transform(preprocessed_story))
+                    stage.rows_out = counts[-1].shape[0]
+                frames.append(pd.DataFrame({'short_name': chunk.loc[keep, 'short_name'], 'story_digest': digests[keep]}))
+        conn.commit()
+        print(f"\nNew or unscored rows since the last incremental run: {matching_count}")
+
+        # 6) TF-IDF with the document frequencies of the corpus including the new stories, 8-9) score
+        with pipeline_timer.stage('score') as stage:
+            new_counts = sparse.vstack(counts).tocsr() if counts else sparse.csr_matrix((0, len(feature_names)))
+            new_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['short_name', 'story_digest'])
+            doc_freq = np.array(state['doc_freq']) + new_counts.getnnz(axis=0)
+            idf = np.log((1 + state['n'] + new_counts.shape[0]) / (1 + doc_freq)) + 1  # TfidfTransformer's smooth IDF
+            tfidf_matrix = normalize(new_counts.multiply(idf).tocsr()) if new_counts.shape[0] else new_counts.astype(float)
+            category_scores, theme_scores = score_stories(tfidf_matrix, keyword_category_matrix, category_theme_matrix)
+            stage.rows_out = len(category_scores)
+
+        # 10) Store the new scores and the updated statistics together
+        with pipeline_timer.stage('store', rows_in=len(new_df)):
+            fold_in(state, new_counts, category_scores, theme_scores, tfidf_matrix)
+            with conn, conn.cursor() as cursor:
+                execute_values(cursor, """
+                    INSERT INTO story_scores (short_name, story_digest, category_scores, theme_scores)
+                    VALUES %s
+                    ON CONFLICT (short_name) DO NOTHING
+                """, list(zip(new_df['short_name'], new_df['story_digest'],
+                              category_scores.tolist(), theme_scores.tolist())), page_size=1000)
+                cursor.execute("""
+                    INSERT INTO analysis_state (name, watermark, state) VALUES ('default', %s, %s)
+                    ON CONFLICT (name) DO UPDATE SET watermark = EXCLUDED.watermark, state = EXCLUDED.state
+                """, (run_started, json.dumps(state)))
+        print(f"Scored {len(new_df)} new stories; {state['n']} stories in total.")
+        if save_scorer:
+            with pipeline_timer.stage('save-scorer'):
+                save_story_scorer(save_scorer, state['doc_freq'], state['n'], feature_names, matcher, tokenizer)
+
+        # 11-13) Reports from the running statistics
+        n = state['n']
+        average_category_weights_sorted = pd.Series(
+            np.array(state['category_sum']) / n if n else 0.0, index=category_names
+        ).sort_values(ascending=False)
+        average_theme_weights_sorted = pd.Series(
+            np.array(state['theme_sum']) / n if n else 0.0, index=theme_names
+        ).sort_values(ascending=False)
+        if 'rankings' in stages:
+            with pipeline_timer.stage('rankings'):
+                report_rankings(average_theme_weights_sorted, average_category_weights_sorted)
+
+        if 'keywords' in stages:
+            with pipeline_timer.stage('keywords'):
+                keyword_contributions = analyze_keyword_contributions(
+                    state['keyword_totals'], keyword_category_matrix, feature_names, category_names
+                )
+                report_keyword_contributions(keyword_contributions, category_to_theme, top_keywords)
+
+        if 'plots' in stages:
+            with pipeline_timer.stage('plots'):
+                corr_cat = correlation_from_sums(n, state['category_sum'], state['category_cross'], category_names)
+                corr_theme = correlation_from_sums(n, state['theme_sum'], state['theme_cross'], theme_names)
+                render_plots(average_theme_weights_sorted, average_category_weights_sorted, corr_cat, corr_theme,
+                         plot_format, dpi, plot_workers)
+
+        # 14) Save the stories scored in this run
+        if 'csv' in stages:
+            with pipeline_timer.stage('csv', rows_in=len(new_df)) as stage:
+                new_df = pd.concat([
+                    new_df[['short_name']],
+                    pd.DataFrame(category_scores, columns=[category_column(c) for c in category_names]),
+                    pd.DataFrame(theme_scores, columns=[theme_column(t) for t in theme_names]),
+                ], axis=1)
+                path = save_results(new_df, output_format, text_columns)
+                stage.rows_out = len(new_df)
+            print(f"\nScores of the newly scored stories saved to '{path}'.")
+
+        # 15) Top stories per category over everything scored so far
+        if 'top-stories' in stages:
+            with pipeline_timer.stage('top-stories') as stage:
+                top_story_texts_by_category = {}
+                for position, category in enumerate(category_names, start=1):
+                    short_names = top_scored_stories(conn, position, top_stories)
+                    if short_names:
+                        texts = fetch_stories(short_names)
+                        top_story_texts_by_category[category] = pd.Series([texts.get(sn) for sn in short_names])
+                save_top_stories(top_story_texts_by_category, top_stories)
+                stage.rows_out = sum(len(texts) for texts in top_story_texts_by_category.values())
+    finally:
+        conn.close()  # also releases the advisory lock
+    pipeline_timer.report()
 
 # ------------------------------------------------------------------------
 # 7. Main Entry
 # ------------------------------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Thematic TF-IDF analysis of crowdfunding stories.")
+    parser.add_argument('--stream', action='store_true',
+                        help="Read and preprocess stories in chunks through a server-side cursor, "
+                             "keeping only keyword counts and scores in memory.")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help="Rows per chunk in --stream mode.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Processes used to clean and tokenize stories (0 = one per CPU).")
+    parser.add_argument('--preprocess-cache', action='store_true',
+                        help="Keep clean and preprocessed stories in the story_preprocess_cache table "
+                             "and only reprocess stories that are new or have changed.")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Score only stories fetched since the last incremental run and update the "
+                             "running statistics stored in the database, then report from those.")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="With --incremental, drop the stored scores and statistics and start over.")
+    parser.add_argument('--matcher', choices=MATCHERS, default='ngram',
+                        help="Keyword counting backend: 'ngram' looks the keywords up among the 1-3-grams of "
+                             "the preprocessed story; 'automaton' finds every keyword, of any length and "
+                             "including hyphenated ones and stopwords, in one pass over the clean story.")
+    parser.add_argument('--tokenizer', choices=TOKENIZERS, default='nltk',
+                        help="Preprocessing for the 'ngram' matcher: 'nltk' runs word_tokenize; 'fast' is one "
+                             "regex split that gives the same tokens for ordinary prose, several times faster "
+                             "(see the README for where the two differ).")
+    parser.add_argument('--stages', type=parse_stages, default=STAGES,
+                        help=f"Comma-separated report stages to run after scoring (default: all of "
+                             f"{','.join(STAGES)}). Libraries a skipped stage needs are not imported.")
+    parser.add_argument('--save-scorer', metavar='PATH',
+                        help="Also save the vocabulary and IDF of the analysed corpus as a model for story_scorer.py.")
+    parser.add_argument('--plot-format', choices=PLOT_FORMATS, default='png',
+                        help="File format of the charts and heatmaps ('none' skips rendering them).")
+    parser.add_argument('--dpi', type=int, default=600, help="Resolution of the rendered figures.")
+    parser.add_argument('--plot-workers', type=int, default=4,
+                        help="Processes rendering figures concurrently (1 = render in this process).")
+    parser.add_argument('--top-keywords', type=int, default=10,
+                        help="Keywords per category printed in the contribution tables (the file lists all).")
+    parser.add_argument('--top-stories', type=int, default=2,
+                        help="Highest scoring stories saved per category.")
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default='csv',
+                        help="Format of the per-story results; parquet and arrow need pyarrow.")
+    parser.add_argument('--text-columns', action='store_true',
+                        help="Include the story text columns in parquet/arrow output (CSV always has them).")
+    parser.add_argument('--profile', action='store_true',
+                        help=f"Also profile every stage with cProfile, into {PROFILE_DIR}/<stage>.prof.")
+    parser.add_argument('--download-nltk', action='store_true',
+                        help="Download the NLTK tokenizer and stopword data next to this script, then exit.")
+    return parser.parse_args(argv)
+
+def parse_stages(value):
+    stages = tuple(stage.strip() for stage in value.split(',') if stage.strip())
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    return stages
+
+def main(argv=None):
+    """Command line entry point."""
+    args = parse_args(argv)
+    workers = args.workers or os.cpu_count()
+    if args.download_nltk:
+        download_nltk_resources()
+    elif args.incremental:
+        incremental_analysis(chunk_size=args.chunk_size, workers=workers, preprocess_cache=args.preprocess_cache,
+                             rebuild=args.rebuild, matcher=args.matcher, stages=args.stages,
+                             save_scorer=args.save_scorer, plot_format=args.plot_format, dpi=args.dpi,
+                             plot_workers=args.plot_workers, top_keywords=args.top_keywords,
+                             top_stories=args.top_stories, output_format=args.output_format,
+                             text_columns=args.text_columns, profile=args.profile, tokenizer=args.tokenizer)
+    else:
+        main_analysis(stream=args.stream, chunk_size=args.chunk_size, workers=workers,
+                      preprocess_cache=args.preprocess_cache, matcher=args.matcher, stages=args.stages,
+                      save_scorer=args.save_scorer, plot_format=args.plot_format, dpi=args.dpi,
+                      plot_workers=args.plot_workers, top_keywords=args.top_keywords, top_stories=args.top_stories,
+                      output_format=args.output_format, text_columns=args.text_columns, profile=args.profile,
+                      tokenizer=args.tokenizer)
+
 if __name__ == "__main__":
-    main_analysis()
+    main()
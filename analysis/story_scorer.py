@@ -0,0 +1,208 @@
+import argparse
+import http.server
+import json
+import sys
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from sentiment_analysis import (
+    PREPROCESS_VERSION, TOKENIZERS, KeywordMatcher, build_incidence_matrices, build_keyword_maps, clean_text,
+    normalize_rows, themes,
+)
+
+# ------------------------------------------------------------------------
+# Online story scoring with a frozen taxonomy model
+#
+# A model is written by `sentiment_analysis.py --save-scorer PATH` and holds the
+# taxonomy, the vocabulary in feature order and the document frequencies of the
+# corpus it was built from, so new stories are weighted exactly like that corpus.
+# ------------------------------------------------------------------------
+MODEL_FORMAT = 1
+
+class StoryScorer:
+    """
+    Scores stories against the taxonomy with IDF weights frozen from a reference corpus.
+    Scores match those of the batch analysis for the same corpus: smooth IDF, L2-normalized
+    TF-IDF rows, keyword -> category -> theme products, then per-story normalization.
+    """
+    def __init__(self, feature_names, doc_freq, n_docs, matcher='ngram', taxonomy=None, tokenizer='nltk'):
+        self.taxonomy = taxonomy or themes
+        self.matcher = matcher
+        self.tokenizer = tokenizer
+        self.preprocess = TOKENIZERS[tokenizer]  # the preprocessing the model's corpus was counted with
+        self.feature_names = list(feature_names)
+        self.doc_freq = np.asarray(doc_freq, dtype=float)
+        self.n_docs = int(n_docs)
+        self.idf = np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1  # TfidfTransformer's smooth IDF
+
+        _, keyword_to_categories, category_to_theme = build_keyword_maps(self.taxonomy)
+        keyword_category_matrix, category_theme_matrix, self.category_names, self.theme_names = (
+            build_incidence_matrices(self.feature_names, keyword_to_categories, category_to_theme)
+        )
+        self.keyword_category_matrix = keyword_category_matrix.toarray()
+        self.category_theme_matrix = category_theme_matrix.toarray()
+
+        if matcher == 'automaton':
+            self.keyword_matcher = KeywordMatcher(self.feature_names)
+        else:
+            from sklearn.feature_extraction.text import CountVectorizer
+            self.count_vectorizer = CountVectorizer(vocabulary=self.feature_names, ngram_range=(1,3))
+            self.analyzer = self.count_vectorizer.build_analyzer()  # the n-grams transform() would look up
+            self.vocabulary = {keyword: i for i, keyword in enumerate(self.feature_names)}
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({
+                'format': MODEL_FORMAT,
+                'preprocess_version': PREPROCESS_VERSION,
+                'matcher': self.matcher,
+                'tokenizer': self.tokenizer,
+                'taxonomy': self.taxonomy,
+                'feature_names': self.feature_names,
+                'doc_freq': self.doc_freq.astype(int).tolist(),
+                'n_docs': self.n_docs,
+            }, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            model = json.load(f)
+        if model.get('format') != MODEL_FORMAT or model.get('preprocess_version') != PREPROCESS_VERSION:
+            raise ValueError(f"{path} was built by an incompatible version of the analysis; rebuild it.")
+        return cls(model['feature_names'], model['doc_freq'], model['n_docs'], model['matcher'], model['taxonomy'],
+                   model.get('tokenizer', 'nltk'))
+
+    def count(self, stories):
+        """Sparse (stories x keywords) counts of raw stories."""
+        clean_stories = [clean_text(story) for story in stories]
+        if self.matcher == 'automaton':
+            return self.keyword_matcher.transform(pd.Series(clean_stories, dtype=object))
+        return self.count_vectorizer.transform([self.preprocess(story) for story in clean_stories])
+
+    def score_batch(self, stories):
+        """Normalized (stories x categories) and (stories x themes) score arrays of raw stories."""
+        tfidf = self.count(stories).multiply(self.idf).tocsr()
+        norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+        tfidf = sparse.diags(np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)) @ tfidf
+        category_scores = tfidf @ self.keyword_category_matrix
+        theme_scores = category_scores @ self.category_theme_matrix
+        return normalize_rows(category_scores), normalize_rows(theme_scores)
+
+    def score(self, story):
+        """
+        Scores of one raw story, as {'categories': {name: weight}, 'themes': {name: weight}}.
+        Same numbers as score_batch, computed on small dense vectors to skip the sparse overhead.
+        """
+        clean_story = clean_text(story)
+        if self.matcher == 'automaton':
+            indices = self.keyword_matcher.match(clean_story)
+        else:
+            found = map(self.vocabulary.get, self.analyzer(self.preprocess(clean_story)))
+            indices = [i for i in found if i is not None]
+        tfidf = np.bincount(indices, minlength=len(self.feature_names)) * self.idf
+        norm = np.sqrt(tfidf @ tfidf)
+        if norm > 0:
+            tfidf /= norm
+        category_scores = tfidf @ self.keyword_category_matrix
+        theme_scores = category_scores @ self.category_theme_matrix
+        return {
+            'categories': dict(zip(self.category_names, normalize_rows(category_scores[None, :])[0].tolist())),
+            'themes': dict(zip(self.theme_names, normalize_rows(theme_scores[None, :])[0].tolist())),
+        }
+
+# ------------------------------------------------------------------------
+# Services: JSON lines on stdin/stdout, or a small local HTTP server
+# ------------------------------------------------------------------------
+def validate_record(record):
+    """Raise ValueError unless `record` is a JSON object whose 'story', if any, is a string."""
+    if not isinstance(record, dict):
+        raise ValueError("Each record must be a JSON object")
+    if not isinstance(record.get('story') or '', str):
+        raise ValueError("'story' must be a string")
+
+def parse_request(request):
+    """The records of a POST /score body: a single record, or a list of them under 'stories'."""
+    if isinstance(request, dict) and 'stories' in request:
+        if not isinstance(request['stories'], list):
+            raise ValueError("'stories' must be a list of JSON objects")
+        for record in request['stories']:
+            validate_record(record)
+        return request['stories']
+    validate_record(request)
+    return None
+
+def score_record(scorer, record):
+    """Score a {'story': ...} record, keeping its other fields (e.g. short_name) in the result."""
+    result = {key: value for key, value in record.items() if key != 'story'}
+    result.update(scorer.score(record.get('story') or ''))
+    return result
+
+def serve_stdin(scorer):
+    """
+    One JSON object with a 'story' field per input line, one JSON result per output line.
+    A line that is not such an object gets an {"error": ...} line instead.
+    """
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            validate_record(record)
+        except ValueError as e:
+            print(json.dumps({'error': f"Invalid input line: {e}"}), flush=True)
+            continue
+        print(json.dumps(score_record(scorer, record)), flush=True)
+
+class ScoringHandler(http.server.BaseHTTPRequestHandler):
+    """POST /score with {'story': ...} or {'stories': [{'story': ...}, ...]}."""
+    scorer = None
+
+    def do_POST(self):
+        if self.path != '/score':
+            self.send_error(404)
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        except ValueError:
+            self.send_error(400, "Body must be JSON")
+            return
+        try:
+            records = parse_request(request)
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        if records is not None:
+            response = [score_record(self.scorer, record) for record in records]
+        else:
+            response = score_record(self.scorer, request)
+        body = json.dumps(response).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_http(scorer, port, host='127.0.0.1'):
+    ScoringHandler.scorer = scorer
+    server = http.server.ThreadingHTTPServer((host, port), ScoringHandler)
+    print(f"Scoring stories on http://{host}:{port}/score", file=sys.stderr)
+    server.serve_forever()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Score crowdfunding stories with a saved taxonomy model.")
+    parser.add_argument('model', help="Model file written by sentiment_analysis.py --save-scorer.")
+    parser.add_argument('--http', type=int, metavar='PORT',
+                        help="Serve POST /score on localhost:PORT instead of reading JSON lines from stdin.")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    scorer = StoryScorer.load(args.model)
+    if args.http:
+        serve_http(scorer, args.http)
+    else:
+        serve_stdin(scorer)
@@ -0,0 +1,104 @@
+import argparse
+import collections
+import json
+import time
+
+from synthetic import DEFAULT_SEED, SIZES, iter_pages, parse_size
+
+# ------------------------------------------------------------------------
+# Check --tokenizer fast against the NLTK path
+#
+# Cleans every story of a reference corpus, preprocesses it with both tokenizers and
+# reports how many outputs are identical, the tokens the two disagree on, a few differing
+# stories and the time each path took. The corpus is the synthetic one by default, a JSON
+# lines file of pages or {"story": ...} records with --input, or the stories the analysis
+# selects from the database with --db. The EDGE_CASES below, the inputs the fast tokenizer
+# has to handle the way Punkt does (abbreviations, initials, periods inside quotes), are
+# compared first on every run.
+# ------------------------------------------------------------------------
+EXAMPLE_WIDTH = 40  # characters of context shown around the first difference of an example
+EDGE_CASES = [
+    "Please sponsor Mr. and Mrs. Jones as they run for St. Luke's hospice.",
+    "Dr. Patel and her team at St. Thomas' hospital were amazing.",
+    "J. K. Rowling once said it is our choices that show who we truly are.",
+    "Thank you to A. Smith, B. Jones and C. Brown for the cakes!",
+    "Meet us at gate J. 5 minutes before the start (near St. Paul's).",
+    "My mum's consultant, Dr. Evans, said \"keep going.\" So we did.",
+    "She said “thank you.” Then we ran the last mile for Mr. Brown.",
+    "Every penny goes to the ward that looked after our Dr.",
+    "We can't wait, we're gonna do it, won't you help?",
+]
+
+def load_stories(args):
+    if args.db:
+        from sentiment_analysis import fetch_data_from_db
+        return fetch_data_from_db()['story'].fillna('').astype(str).tolist()
+    if args.input:
+        with open(args.input) as f:
+            return [json.loads(line).get('story') or '' for line in f if line.strip()]
+    return [page['story'] for page in iter_pages(args.seed, args.size)]
+
+def timed(func, texts):
+    started = time.perf_counter()
+    results = [func(text) for text in texts]
+    return results, time.perf_counter() - started
+
+def first_difference(expected, actual):
+    """Index of the first token where the two token lists differ."""
+    for i, (a, b) in enumerate(zip(expected, actual)):
+        if a != b:
+            return i
+    return min(len(expected), len(actual))
+
+def compare(stories, examples=5, top_tokens=10, label='stories'):
+    from sentiment_analysis import clean_text, load_tokenizer
+    preprocess_text, preprocess_text_fast = load_tokenizer('nltk'), load_tokenizer('fast')  # load outside the timings
+    clean_stories = [clean_text(story) for story in stories]
+    expected, nltk_seconds = timed(preprocess_text, clean_stories)
+    actual, fast_seconds = timed(preprocess_text_fast, clean_stories)
+
+    missing, extra = collections.Counter(), collections.Counter()
+    differing = []
+    for clean, a, b in zip(clean_stories, expected, actual):
+        if a != b:
+            a, b = a.split(), b.split()
+            missing.update((collections.Counter(a) - collections.Counter(b)).elements())
+            extra.update((collections.Counter(b) - collections.Counter(a)).elements())
+            differing.append((clean, a, b))
+
+    n = len(clean_stories)
+    print(f"{n} {label}: {n - len(differing)} identical, {len(differing)} differ "
+          f"({len(differing) / n:.2%})." if n else f"No {label}.")
+    print(f"nltk {nltk_seconds:.2f}s, fast {fast_seconds:.2f}s"
+          + (f" ({nltk_seconds / fast_seconds:.1f}x)" if fast_seconds else ""))
+    if missing:
+        print(f"Tokens only nltk produced:  {', '.join(f'{t} ({c})' for t, c in missing.most_common(top_tokens))}")
+    if extra:
+        print(f"Tokens only fast produced:  {', '.join(f'{t} ({c})' for t, c in extra.most_common(top_tokens))}")
+    for clean, a, b in differing[:examples]:
+        i = first_difference(a, b)
+        print(f"\n  nltk: ... {' '.join(a[max(0, i - 3):i + 4])} ...")
+        print(f"  fast: ... {' '.join(b[max(0, i - 3):i + 4])} ...")
+        word = (a[i:] or b[i:])[0]
+        position = clean.lower().find(word)
+        if position >= 0:
+            start = max(0, position - EXAMPLE_WIDTH // 2)
+            print(f"  text: ... {clean[start:start + EXAMPLE_WIDTH]!r} ...")
+    return len(differing)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare the fast tokenizer with NLTK word_tokenize on a corpus.")
+    parser.add_argument('--size', type=parse_size, default=SIZES['10k'],
+                        help=f"Synthetic pages to compare: {', '.join(SIZES)} or a number.")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--input', metavar='PATH', help="JSON lines file of pages (or any records with a 'story').")
+    parser.add_argument('--db', action='store_true',
+                        help="Compare on the stories the analysis selects from the database named by DB_NAME.")
+    parser.add_argument('--examples', type=int, default=5, help="Differing stories to show.")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    compare(EDGE_CASES, len(EDGE_CASES), label='edge cases')
+    print()
+    compare(load_stories(args), args.examples)
@@ -0,0 +1,158 @@
+import argparse
+import functools
+import http.server
+import json
+import math
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from synthetic import DEFAULT_SEED, SIZES, catalog, make_page, parse_size, taxonomy_keywords
+
+# ------------------------------------------------------------------------
+# Local stand-in for the JustGiving API
+#
+# Serves /{app_id}/v1/fundraising/search and /{app_id}/v1/fundraising/pages/{name} over a
+# seeded synthetic catalog, with configurable latency and injected 429 and 5xx responses.
+# Point the search script at it with JUSTGIVING_BASE_URL=http://127.0.0.1:PORT/APP_ID.
+# ------------------------------------------------------------------------
+SEARCH_CACHE_SIZE = 4096  # distinct queries whose matching pages are kept
+
+class FakeJustGiving:
+    """
+    The catalog and the fault model. A search for `q` matches the pages whose short name
+    contains `q`, in page order. Each request first waits `latency_ms` (+/- `jitter_ms`),
+    then fails with 429 (with Retry-After) or a 5xx with the given probabilities.
+    """
+    def __init__(self, size, seed=DEFAULT_SEED, latency_ms=0.0, jitter_ms=0.0,
+                 rate_429=0.0, rate_5xx=0.0, retry_after=1):
+        self.seed = seed
+        self.short_names = catalog(seed, size)
+        self.page_ids = {name: i for i, name in enumerate(self.short_names)}
+        self.keywords = taxonomy_keywords()
+        self.latency_ms, self.jitter_ms = latency_ms, jitter_ms
+        self.rate_429, self.rate_5xx, self.retry_after = rate_429, rate_5xx, retry_after
+        self.rng = random.Random(seed)  # drives latency and faults; shared by the handler threads
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.matches = functools.lru_cache(maxsize=SEARCH_CACHE_SIZE)(self.find_matches)
+
+    def find_matches(self, query):
+        return [name for name in self.short_names if query in name]
+
+    def draw(self):
+        """(delay in seconds, injected status or None) for the next request."""
+        with self.lock:
+            delay = max(0.0, self.rng.gauss(self.latency_ms, self.jitter_ms)) / 1000 if self.latency_ms else 0.0
+            fault = self.rng.random()
+        if fault < self.rate_429:
+            return delay, 429
+        if fault < self.rate_429 + self.rate_5xx:
+            return delay, 503 if fault < self.rate_429 + self.rate_5xx / 2 else 500
+        return delay, None
+
+    def count(self, endpoint, status):
+        with self.lock:
+            key = f'{endpoint} {status}'
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def search(self, params):
+        query = params.get('q', [''])[0].lower()
+        page = max(1, int(params.get('page', ['1'])[0]))
+        page_size = max(1, int(params.get('pageSize', ['20'])[0]))
+        matches = self.matches(query)
+        start = (page - 1) * page_size
+        return {
+            'SearchResults': [
+                {'PageShortName': name, 'PageUrl': f'https://www.justgiving.com/fundraising/{name}'}
+                for name in matches[start:start + page_size]
+            ],
+            'Count': len(matches),
+            'totalPages': math.ceil(len(matches) / page_size),
+        }
+
+    def page_details(self, short_name):
+        i = self.page_ids.get(short_name)
+        return None if i is None else make_page(self.seed, i, self.keywords)
+
+class FakeJustGivingHandler(http.server.BaseHTTPRequestHandler):
+    api = None
+    protocol_version = 'HTTP/1.1'  # keep-alive, as the real API
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/_stats':
+            self.send_json(200, self.api.counts)
+            return
+        if url.path.endswith('/v1/fundraising/search'):
+            endpoint = 'search'
+        elif '/v1/fundraising/pages/' in url.path:
+            endpoint = 'details'
+        else:
+            self.send_json(404, {'error': 'Not found'})
+            return
+
+        delay, fault = self.api.draw()
+        if delay:
+            time.sleep(delay)
+        if fault:
+            self.api.count(endpoint, fault)
+            headers = {'Retry-After': str(self.api.retry_after)} if fault == 429 else {}
+            self.send_json(fault, {'error': 'Injected failure'}, headers)
+            return
+
+        if endpoint == 'search':
+            self.api.count(endpoint, 200)
+            self.send_json(200, self.api.search(parse_qs(url.query)))
+            return
+        details = self.api.page_details(url.path.rsplit('/', 1)[-1])
+        status = 404 if details is None else 200
+        self.api.count(endpoint, status)
+        self.send_json(status, details or {'error': 'Page not found'})
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(api, port=0, host='127.0.0.1'):
+    """Serve `api` on a background thread; returns the server (port 0 picks a free one)."""
+    handler = type('Handler', (FakeJustGivingHandler,), {'api': api})
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-justgiving', daemon=True).start()
+    return server
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Local stand-in for the JustGiving fundraising API.")
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--size', type=parse_size, default=SIZES['10k'],
+                        help=f"Pages in the catalog: {', '.join(SIZES)} or a number.")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Mean delay added to every response.")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Standard deviation of that delay.")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="Share of requests answered 429.")
+    parser.add_argument('--rate-5xx', type=float, default=0.0, help="Share of requests answered 500 or 503.")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with a 429.")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    api = FakeJustGiving(args.size, args.seed, args.latency_ms, args.jitter_ms,
+                         args.rate_429, args.rate_5xx, args.retry_after)
+    server = start_server(api, args.port)
+    print(f"Fake JustGiving API with {args.size} pages on http://127.0.0.1:{args.port}/APP_ID "
+          f"(counts on /_stats). Ctrl-C to stop.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
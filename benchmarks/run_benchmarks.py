@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from synthetic import DEFAULT_SEED, REPO_ROOT, SIZES, ensure_corpus_tables, load_corpus, parse_size
+
+# ------------------------------------------------------------------------
+# Benchmark scenarios
+#
+#   search:   crawl the fake JustGiving API with justgiving_search.py into an empty database
+#   analysis: run sentiment_analysis.py over a synthetic corpus loaded into the database
+#
+# Both run the real scripts in a child process against the database named by --db-name
+# (default justgiving_bench; its crowdfunding and query_state tables are emptied), and
+# append one JSON result per run to --results; each run is compared with the last stored
+# run of the same configuration.
+# ------------------------------------------------------------------------
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = os.path.join(BENCH_DIR, 'results.jsonl')
+SCENARIOS = ('search', 'analysis')
+COMPARED_METRICS = ('seconds', 'pages_per_second', 'stories_per_second', 'peak_rss_mb')
+
+def run_child(command, cwd, env=None):
+    """Run `command` in `cwd`, returning (wall seconds, CPU seconds, peak RSS in MB) of that process alone."""
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, env=env)
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.perf_counter() - started
+    if process.returncode:
+        raise SystemExit(f"{' '.join(command)} exited with status {process.returncode}.")
+    return elapsed, usage.ru_utime + usage.ru_stime, usage.ru_maxrss / 1024  # ru_maxrss is in KB on Linux
+
+def clear_tables(*tables):
+    """Empty `tables` of the benchmark database, creating the crawler and corpus tables first if needed."""
+    from sentiment_analysis import get_db_connection
+    conn = get_db_connection()
+    try:
+        ensure_corpus_tables(conn)
+        with conn.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {', '.join(tables)};")
+        conn.commit()
+    finally:
+        conn.close()
+
+def run_search(args):
+    from fake_justgiving import FakeJustGiving, start_server
+    clear_tables('crowdfunding', 'query_state', 'benchmark_corpus')
+
+    api = FakeJustGiving(args.size, args.seed, args.latency_ms, args.jitter_ms,
+                         args.rate_429, args.rate_5xx, args.retry_after)
+    server = start_server(api)
+    env = dict(os.environ, JUSTGIVING_BASE_URL=f'http://127.0.0.1:{server.server_port}/APP_ID')
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics_path = os.path.join(tmp, 'metrics.json')
+        command = [sys.executable, os.path.join(REPO_ROOT, 'search', 'justgiving_search.py'),
+                   '--reset-state', '--log-level', 'WARNING', '--rate-limit', str(args.rate_limit),
+                   '--concurrency', str(args.concurrency), '--metrics-file', metrics_path] + args.extra
+        elapsed, cpu, peak_rss = run_child(command, tmp, env)
+        with open(metrics_path) as f:
+            snapshot = json.load(f)
+    server.shutdown()
+
+    counters = snapshot['counters']
+    pages = counters.get('justgiving_pages_saved_total', 0)
+    requests = sum(api.counts.values())
+    return {
+        'seconds': elapsed,
+        'cpu_seconds': cpu,
+        'peak_rss_mb': peak_rss,
+        'pages': pages,
+        'pages_per_second': pages / elapsed,
+        'requests': requests,
+        'requests_per_second': requests / elapsed,
+        'responses': api.counts,
+        'stages': {name: {'seconds': h['mean'] * h['count'], 'calls': h['count']}
+                   for name, h in snapshot['histograms'].items()},
+    }
+
+def run_analysis(args):
+    from sentiment_analysis import get_db_connection
+    conn = get_db_connection()
+    try:
+        load_seconds = load_corpus(conn, args.seed, args.size)
+    finally:
+        conn.close()
+
+    from sentiment_analysis import TIMINGS_FILE
+    with tempfile.TemporaryDirectory() as tmp:
+        command = [sys.executable, os.path.join(REPO_ROOT, 'analysis', 'sentiment_analysis.py')] + args.extra
+        elapsed, cpu, peak_rss = run_child(command, tmp)  # the reports and the timing summary land in tmp
+        with open(os.path.join(tmp, TIMINGS_FILE)) as f:
+            timings = json.load(f)
+    stages = {record['stage']: {'seconds': record['wall_seconds'], 'calls': record['calls'],
+                                'cpu_seconds': record['cpu_seconds'], 'peak_rss_mb': record['peak_rss_mb'],
+                                'rows_in': record['rows_in'], 'rows_out': record['rows_out']}
+              for record in timings['stages']}
+    stories = stages['score']['rows_out']
+    return {
+        'seconds': elapsed,
+        'cpu_seconds': cpu,
+        'peak_rss_mb': peak_rss,
+        'corpus_load_seconds': load_seconds,
+        'stories': stories,
+        'stories_per_second': stories / elapsed,
+        'stages': stages,
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def report(result, previous=None):
+    print(f"\n[{result['scenario']} size={result['size']}] {result['seconds']:.2f}s wall, "
+          f"{result['cpu_seconds']:.2f}s CPU, peak RSS {result['peak_rss_mb']:.0f} MB")
+    for metric in ('pages_per_second', 'requests_per_second', 'stories_per_second'):
+        if metric in result:
+            print(f"  {metric.replace('_', ' ')}: {result[metric]:.1f}")
+    for stage, timing in result['stages'].items():
+        print(f"  {stage:<60} {timing['seconds']:9.3f}s  ({timing['calls']} calls)")
+    if previous:
+        print(f"  vs {previous['revision']} at {previous['timestamp']}:")
+        for metric in COMPARED_METRICS:
+            if metric in result and previous.get(metric):
+                change = (result[metric] / previous[metric] - 1) * 100
+                print(f"    {metric}: {previous[metric]:.2f} -> {result[metric]:.2f} ({change:+.1f}%)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the search and analysis scripts on synthetic data.",
+                                     epilog="Arguments after -- are passed to the benchmarked script.")
+    parser.add_argument('scenario', choices=SCENARIOS)
+    parser.add_argument('--size', type=parse_size, default=SIZES['10k'],
+                        help=f"Pages in the catalog or corpus: {', '.join(SIZES)} or a number.")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--repeat', type=int, default=1, help="Runs of the scenario, each stored separately.")
+    parser.add_argument('--db-name', default='justgiving_bench',
+                        help="Scratch database the scenarios write to (its tables are emptied).")
+    parser.add_argument('--results', default=RESULTS_FILE, help="JSON lines file the results are appended to.")
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="search: mean API response delay.")
+    parser.add_argument('--jitter-ms', type=float, default=5.0, help="search: standard deviation of that delay.")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="search: share of requests answered 429.")
+    parser.add_argument('--rate-5xx', type=float, default=0.0, help="search: share of requests answered 500/503.")
+    parser.add_argument('--retry-after', type=int, default=1, help="search: Retry-After seconds sent with a 429.")
+    parser.add_argument('--concurrency', type=int, default=1, help="search: --concurrency of the crawler.")
+    parser.add_argument('--rate-limit', type=float, default=0.0,
+                        help="search: --rate-limit of the crawler (default 0, unthrottled).")
+    argv = sys.argv[1:]
+    extra = argv[argv.index('--') + 1:] if '--' in argv else []
+    args = parser.parse_args(argv[:argv.index('--')] if '--' in argv else argv)
+    args.extra = extra
+    return args
+
+if __name__ == '__main__':
+    args = parse_args()
+    os.environ['DB_NAME'] = args.db_name  # read by both scripts when imported or started
+    run = run_search if args.scenario == 'search' else run_analysis
+    for _ in range(args.repeat):
+        config = {'scenario': args.scenario, 'size': args.size, 'seed': args.seed, 'arguments': args.extra}
+        if args.scenario == 'search':
+            config.update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_429=args.rate_429,
+                          rate_5xx=args.rate_5xx, concurrency=args.concurrency, rate_limit=args.rate_limit)
+        previous = [r for r in load_results(args.results) if all(r.get(k) == v for k, v in config.items())]
+        result = dict(config, timestamp=datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                      revision=git_revision(), python=platform.python_version(), cpus=os.cpu_count())
+        result.update(run(args))
+        with open(args.results, 'a') as f:
+            f.write(json.dumps(result) + '\n')
+        report(result, previous[-1] if previous else None)
@@ -0,0 +1,172 @@
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'analysis'))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'search'))
+
+# ------------------------------------------------------------------------
+# Seeded synthetic JustGiving pages and stories
+#
+# Page i of a catalog is generated from (seed, i) alone, so the fake API can build any
+# page on request and a corpus loaded into PostgreSQL holds exactly the same stories.
+# ------------------------------------------------------------------------
+DEFAULT_SEED = 1234
+SIZES = {'10k': 10_000, '100k': 100_000, '1M': 1_000_000}
+CHARITY_APPEAL_SHARE = 0.8  # pages the analysis selects (activityType CharityAppeal, not charity-created)
+KEYWORD_PROBABILITY = 0.35  # chance that a sentence carries a taxonomy keyword
+LOAD_BATCH_SIZE = 10000     # rows per COPY into the crowdfunding table
+
+FIRST_NAMES = ['alex', 'sam', 'jo', 'chris', 'emma', 'olivia', 'liam', 'noah', 'amelia', 'isla', 'jack',
+               'harry', 'sophie', 'grace', 'mia', 'oscar', 'lucy', 'ella', 'james', 'zara', 'ben', 'ruby']
+LAST_NAMES = ['smith', 'jones', 'taylor', 'brown', 'williams', 'wilson', 'johnson', 'davies', 'patel',
+              'wright', 'walker', 'evans', 'thomas', 'roberts', 'khan', 'lewis', 'hughes', 'green']
+EVENTS = ['london marathon', 'great north run', 'skydive', 'three peaks challenge', 'bake sale',
+          'charity cycle', 'sponsored swim', 'tough mudder', 'head shave', 'walk for life']
+CHARITIES = ['cancer research uk', 'macmillan', 'mind', 'british heart foundation', 'oxfam',
+             'shelter', 'rspca', 'save the children', 'alzheimers society', 'local hospice']
+FILLER = ('i am we are taking part in the this year to raise money for an amazing charity that has '
+          'helped so many people please give what you can every pound counts thank you all so much '
+          'for your support training has been hard but it will be worth it our team will be doing '
+          'something special with lots of people who care about it and want to help').split()
+
+def parse_size(value):
+    """'10k', '100k', '1M' or a plain number of rows."""
+    if value in SIZES:
+        return SIZES[value]
+    try:
+        return int(value.replace('_', ''))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"size must be one of {', '.join(SIZES)} or a number, not {value!r}")
+
+def taxonomy_keywords():
+    from sentiment_analysis import themes
+    return sorted({kw for categories in themes.values() for keywords in categories.values() for kw in keywords})
+
+def short_name(seed, i):
+    rng = random.Random(seed * 1_000_003 + i)
+    return f"{rng.choice(FIRST_NAMES)}-{rng.choice(LAST_NAMES)}-{i}"
+
+def catalog(seed, size):
+    """Short names of the `size` pages of a catalog, in page order."""
+    return [short_name(seed, i) for i in range(size)]
+
+def make_story(rng, keywords):
+    """A story of 3-15 sentences of filler, some carrying a keyword, with HTML, entities and links."""
+    sentences = []
+    for _ in range(rng.randint(3, 15)):
+        words = rng.choices(FILLER, k=rng.randint(6, 18))
+        if rng.random() < KEYWORD_PROBABILITY:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keywords))
+        sentences.append(' '.join(words).capitalize() + '.')
+    if rng.random() < 0.2:
+        sentences.append('Read more at https://example.org/' + rng.choice(LAST_NAMES) + ' &amp; share.')
+    return ''.join(f'<p>{s}</p>' if rng.random() < 0.5 else s + ' ' for s in sentences)
+
+def make_page(seed, i, keywords):
+    """The page details of page `i`, shaped like the JustGiving fundraising page endpoint's."""
+    rng = random.Random(seed * 1_000_003 + i)
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    event, charity = rng.choice(EVENTS), rng.choice(CHARITIES)
+    appeal = rng.random() < CHARITY_APPEAL_SHARE
+    return {
+        'pageId': i,
+        'pageShortName': f"{first}-{last}-{i}",
+        'title': f"{first.title()}'s {event} for {charity}",
+        'activityType': 'CharityAppeal' if appeal else rng.choice(['InMemory', 'Wedding', 'Birthday']),
+        'activityCharityCreated': False,
+        'eventName': event,
+        'charity': {'name': charity},
+        'targetAmount': rng.choice([100, 250, 500, 1000, 2500]),
+        'grandTotalRaisedExcludingGiftAid': round(rng.random() * 3000, 2),
+        'status': 'Active',
+        'story': make_story(rng, keywords),
+    }
+
+def iter_pages(seed, size):
+    keywords = taxonomy_keywords()
+    for i in range(size):
+        yield make_page(seed, i, keywords)
+
+# ------------------------------------------------------------------------
+# Loading a corpus into the benchmark database
+# ------------------------------------------------------------------------
+def ensure_corpus_tables(conn):
+    # Importing the search script creates the crowdfunding schema (with the generated
+    # story/is_charity_appeal columns) in the database named by the DB_* variables.
+    import justgiving_search  # noqa: F401
+    with conn.cursor() as cursor:
+        cursor.execute("CREATE TABLE IF NOT EXISTS benchmark_corpus (seed INT, size INT);")
+
+def corpus_loaded(conn, seed, size):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT seed, size FROM benchmark_corpus")
+        return cursor.fetchall() == [(seed, size)]
+
+def load_corpus(conn, seed, size, force=False):
+    """
+    Replace the crowdfunding table's rows with the `size` pages of catalog `seed`, unless it
+    already holds exactly that corpus. Returns the seconds spent loading (0 if reused).
+    """
+    from justgiving_search import content_hash
+    ensure_corpus_tables(conn)
+    if not force and corpus_loaded(conn, seed, size):
+        print(f"Corpus of {size} pages (seed {seed}) already loaded.")
+        return 0.0
+
+    started = time.perf_counter()
+    fetched_at = datetime.now(timezone.utc).isoformat()
+    with conn.cursor() as cursor:
+        cursor.execute("TRUNCATE crowdfunding, benchmark_corpus;")
+        batch = io.StringIO()
+        writer = csv.writer(batch)
+        for page in iter_pages(seed, size):
+            writer.writerow([page['pageShortName'], json.dumps(page), fetched_at, content_hash(page)])
+            if page['pageId'] % LOAD_BATCH_SIZE == LOAD_BATCH_SIZE - 1:
+                copy_batch(cursor, batch)
+                batch.seek(0)
+                batch.truncate()
+        copy_batch(cursor, batch)
+        cursor.execute("INSERT INTO benchmark_corpus VALUES (%s, %s);", (seed, size))
+    conn.commit()
+    elapsed = time.perf_counter() - started
+    print(f"Loaded {size} pages (seed {seed}) in {elapsed:.1f}s.")
+    return elapsed
+
+def copy_batch(cursor, batch):
+    batch.seek(0)
+    cursor.copy_expert("""
+        COPY crowdfunding (short_name, details, fetched_at, content_hash) FROM STDIN WITH (FORMAT csv);
+    """, batch)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic corpus of JustGiving pages.")
+    parser.add_argument('--size', type=parse_size, default=SIZES['10k'],
+                        help=f"Number of pages: {', '.join(SIZES)} or a number.")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--out', metavar='PATH',
+                        help="Write the pages as JSON lines to PATH instead of loading them into the database "
+                             "named by DB_NAME (whose crowdfunding table is emptied first).")
+    parser.add_argument('--force', action='store_true', help="Reload even if the database holds this corpus.")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.out:
+        with open(args.out, 'w') as f:
+            for page in iter_pages(args.seed, args.size):
+                f.write(json.dumps(page) + '\n')
+    else:
+        from sentiment_analysis import get_db_connection
+        conn = get_db_connection()
+        try:
+            load_corpus(conn, args.seed, args.size, args.force)
+        finally:
+            conn.close()
@@ -1,32 +1,72 @@
 #!/usr/bin/env python3
-import sys
+import argparse
+import asyncio
+import email.utils
+import functools
+import hashlib
+import http.server
 import requests
+import threading
 import time
 import json
+import zlib
+import math
 import psycopg2
+import logging
+import socket
+import sqlite3
 import string
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from psycopg2.extras import execute_values
+from requests.adapters import HTTPAdapter
 import os
 
+log = logging.getLogger('justgiving_search')
+
 # Configuration
 APP_ID = 'YOUR_JUSTGIVING_APP_ID'  # Replace with your actual APP_ID
-BASE_URL = f'https://api.justgiving.com/{APP_ID}'
+BASE_URL = os.getenv("JUSTGIVING_BASE_URL", f'https://api.justgiving.com/{APP_ID}')  # overridable for local test servers
 PAGE_SIZE = 100
 MAX_PAGES = 500
 MAX_PAGES_THRESHOLD = 300
 MAX_RETRIES = 5
 INITIAL_BACKOFF = 2.0
 MAX_RECURSION_DEPTH = 3
+RATE_LIMIT = 10.0          # requests per second across all workers (0 disables the budget)
+MIN_RATE_LIMIT = 0.5       # floor for the adaptive rate after repeated throttling
+RATE_INCREASE = 0.05       # additive increase per successful request
+RATE_DECREASE = 0.5        # multiplicative decrease per throttling episode
+RATE_SYNC_SECONDS = 1.0    # how often a crawler reads the throttle state shared by all crawlers
+HTTP_POOL_SIZE = 10        # keep-alive connections held open to the API
+WRITE_BATCH_SIZE = 500     # crawled pages buffered before a database flush
+FLUSH_EVERY_PAGES = 10     # search pages whose state advance may be held back
+LEASE_SECONDS = 300        # how long a worker's claim on a query lasts without a heartbeat
+HEARTBEAT_SECONDS = 60     # how often a worker renews its lease while it crawls a claimed query
+WORKER_POLL_SECONDS = 10   # idle worker wait while other workers still hold claims
+WORKER_SEED_LOCK = 72031   # advisory lock key held while the first worker seeds query_state
+REFRESH_MAX_AGE_HOURS = 24 # pages fetched longer ago than this are stale in --refresh mode
+REFRESH_BATCH_SIZE = 500   # stale pages re-fetched per refresh transaction
+CACHE_TTL_HOURS = 24       # age after which cached API responses are re-requested
+CACHE_MAX_MB = 2048        # size of the response cache before least recently used entries go
+METRICS_INTERVAL = 30      # seconds between JSON metrics snapshots (--metrics-file)
 LETTERS = string.ascii_lowercase
+QUERY_ALPHABET = LETTERS + string.digits + '-'  # characters a short name can contain; the planner splits over all of them
 
 # PostgreSQL connection
-conn = psycopg2.connect(
-    host=os.getenv("DB_HOST", "YOUR_HOST"),
-    database=os.getenv("DB_NAME", "YOUR_DATABASE_NAME"),
-    user=os.getenv("DB_USER", "YOUR_USERNAME"),
-    password=os.getenv("DB_PASSWORD", "YOUR_PASSWORD")
-)
-conn.autocommit = True
+def connect():
+    """Open an autocommit connection to the crawl database."""
+    connection = psycopg2.connect(
+        host=os.getenv("DB_HOST", "YOUR_HOST"),
+        database=os.getenv("DB_NAME", "YOUR_DATABASE_NAME"),
+        user=os.getenv("DB_USER", "YOUR_USERNAME"),
+        password=os.getenv("DB_PASSWORD", "YOUR_PASSWORD")
+    )
+    connection.autocommit = True
+    return connection
+
+conn = connect()
 cursor = conn.cursor()
 
 # Ensure necessary tables exist
@@ -39,6 +79,13 @@ cursor.execute("""
     );
 """)
 
+# Claim columns used by --worker mode
+cursor.execute("""
+    ALTER TABLE query_state
+        ADD COLUMN IF NOT EXISTS claimed_by TEXT,
+        ADD COLUMN IF NOT EXISTS lease_expires TIMESTAMPTZ;
+""")
+
 cursor.execute("""
     CREATE TABLE IF NOT EXISTS crowdfunding (
         short_name TEXT PRIMARY KEY,
@@ -46,61 +93,519 @@ cursor.execute("""
     );
 """)
 
+# Freshness columns used by --refresh mode
+cursor.execute("""
+    ALTER TABLE crowdfunding
+        ADD COLUMN IF NOT EXISTS fetched_at TIMESTAMPTZ,
+        ADD COLUMN IF NOT EXISTS content_hash TEXT;
+""")
+cursor.execute("CREATE INDEX IF NOT EXISTS crowdfunding_fetched_at_idx ON crowdfunding (fetched_at NULLS FIRST);")
+
+# Columns extracted from details for the analysis, so it can filter on an index and read the
+# story without detoasting whole documents (stored generated columns need PostgreSQL 12+)
+cursor.execute("""
+    ALTER TABLE crowdfunding
+        ADD COLUMN IF NOT EXISTS story TEXT
+            GENERATED ALWAYS AS (details->>'story') STORED,
+        ADD COLUMN IF NOT EXISTS is_charity_appeal BOOLEAN
+            GENERATED ALWAYS AS (details->>'activityCharityCreated' = 'false'
+                                 AND details->>'activityType' = 'CharityAppeal') STORED;
+""")
+cursor.execute("""
+    CREATE INDEX IF NOT EXISTS crowdfunding_charity_appeal_idx
+        ON crowdfunding (fetched_at) WHERE is_charity_appeal;
+""")
+
+# Throttle state shared by every crawler process (see SharedThrottle)
+cursor.execute("""
+    CREATE TABLE IF NOT EXISTS rate_limit_state (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        rate DOUBLE PRECISION,
+        paused_until TIMESTAMPTZ,
+        episode BIGINT NOT NULL DEFAULT 0
+    );
+""")
+cursor.execute("INSERT INTO rate_limit_state (id) VALUES (TRUE) ON CONFLICT DO NOTHING;")
+
 def reset_query_state():
     """
     Truncate only the 'query_state' table,
     leaving existing records in 'crowdfunding' intact.
     """
-    print("[RESET] Truncating table 'query_state' only. 'crowdfunding' remains unchanged.")
+    log.info("[RESET] Truncating table 'query_state' only. 'crowdfunding' remains unchanged.")
     cursor.execute("TRUNCATE TABLE query_state;")
-    print("[RESET] Query state truncated. Next run will start from scratch for all queries.")
+    log.info("[RESET] Query state truncated. Next run will start from scratch for all queries.")
+
+class Metrics:
+    """
+    In-process crawler instrumentation: counters, gauges and latency histograms, keyed by
+    metric name and labels, rendered in the Prometheus text format or as a JSON snapshot.
+    """
+    LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'buckets': [0] * len(self.LATENCY_BUCKETS), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.LATENCY_BUCKETS):
+                if seconds <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+    def collect_runtime_gauges(self):
+        """Refresh the gauges read from the shared HTTP session and rate limiter."""
+        for stat, value in http_session.stats().items():
+            self.set_gauge(f'justgiving_http_{stat}', value)
+        self.set_gauge('justgiving_rate_limit_per_second', rate_limiter.rate)
+        uptime = time.monotonic() - self.started
+        self.set_gauge('justgiving_uptime_seconds', uptime)
+        with self.lock:
+            saved = sum(v for (name, _), v in self.counters.items() if name == 'justgiving_pages_saved_total')
+        self.set_gauge('justgiving_pages_saved_per_second', saved / uptime if uptime else 0.0)
+
+    @staticmethod
+    def format_labels(labels, extra=()):
+        labels = tuple(labels) + tuple(extra)
+        if not labels:
+            return ''
+        return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+    def render_prometheus(self):
+        self.collect_runtime_gauges()
+        lines = []
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f'{name}{self.format_labels(labels)} {value}')
+            for (name, labels), value in sorted(self.gauges.items()):
+                lines.append(f'{name}{self.format_labels(labels)} {value}')
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                for bound, count in zip(self.LATENCY_BUCKETS, histogram['buckets']):
+                    lines.append(f'{name}_bucket{self.format_labels(labels, [("le", bound)])} {count}')
+                lines.append(f'{name}_bucket{self.format_labels(labels, [("le", "+Inf")])} {histogram["count"]}')
+                lines.append(f'{name}_sum{self.format_labels(labels)} {histogram["sum"]}')
+                lines.append(f'{name}_count{self.format_labels(labels)} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        self.collect_runtime_gauges()
+        with self.lock:
+            return {
+                'counters': {f'{n}{self.format_labels(l)}': v for (n, l), v in self.counters.items()},
+                'gauges': {f'{n}{self.format_labels(l)}': v for (n, l), v in self.gauges.items()},
+                'histograms': {
+                    f'{n}{self.format_labels(l)}': {
+                        'count': h['count'],
+                        'mean': h['sum'] / h['count'] if h['count'] else 0.0,
+                        'buckets': dict(zip(map(str, self.LATENCY_BUCKETS), h['buckets'])),
+                    }
+                    for (n, l), h in self.histograms.items()
+                },
+            }
+
+metrics = Metrics()
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the crawler metrics in the Prometheus text format on /metrics."""
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.debug("[METRICS] " + format, *args)
+
+def start_metrics_server(port):
+    server = http.server.ThreadingHTTPServer(('', port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    log.info(f"[METRICS] Serving Prometheus metrics on port {port} at /metrics.")
+
+def write_metrics_snapshot(path):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(metrics.snapshot(), f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def start_metrics_writer(path, interval=METRICS_INTERVAL):
+    """Write a JSON metrics snapshot to `path` every `interval` seconds."""
+    def run():
+        while True:
+            time.sleep(interval)
+            write_metrics_snapshot(path)
+    threading.Thread(target=run, name='metrics-writer', daemon=True).start()
+    log.info(f"[METRICS] Writing a JSON metrics snapshot to '{path}' every {interval}s.")
+
+class SharedThrottle:
+    """
+    Throttle state shared by every crawler process, on any host, through the single-row
+    'rate_limit_state' table: the rate set by the latest cut (numbered by `episode`) and the
+    time until which all requests are paused. It has its own connection, because it is
+    called from request threads; a database error only costs the sharing, not the crawl.
+    """
+    def __init__(self):
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def execute(self, sql, params):
+        with self.lock:
+            try:
+                if self.conn is None:
+                    self.conn = connect()
+                with self.conn.cursor() as shared_cursor:
+                    shared_cursor.execute(sql, params)
+                    return shared_cursor.fetchone()
+            except psycopg2.Error as e:
+                log.warning(f"[RATE] Could not reach the shared throttle state: {e}")
+                if self.conn is not None:
+                    self.conn.close()
+                self.conn = None
+                return None
+
+    def publish(self, pause, rate=None):
+        """Pause every crawler for `pause` seconds and, given a `rate`, record a cut to it. Returns the episode."""
+        row = self.execute("""
+            UPDATE rate_limit_state SET
+                paused_until = GREATEST(paused_until, now() + %s * interval '1 second'),
+                rate = COALESCE(%s, rate),
+                episode = episode + (%s IS NOT NULL)::int
+            RETURNING episode;
+        """, (pause, rate, rate))
+        return row[0] if row else None
+
+    def read(self):
+        """(rate of the latest cut, seconds the shared pause still lasts, episode), or None."""
+        return self.execute("""
+            SELECT rate, GREATEST(0, EXTRACT(EPOCH FROM paused_until - now()))::float, episode
+            FROM rate_limit_state;
+        """, ())
+
+class RateLimiter:
+    """
+    Token bucket shared by every outgoing JustGiving request, whichever worker sends it.
+    The refill rate adapts AIMD-style: a throttled response (429/503) cuts it by
+    RATE_DECREASE and pauses all callers for Retry-After (or the caller's backoff);
+    each successful response adds RATE_INCREASE back, up to the configured budget.
+    With a `shared` SharedThrottle, cuts and pauses also reach the other crawler
+    processes, which read them every RATE_SYNC_SECONDS.
+    """
+    def __init__(self, rate=RATE_LIMIT, min_rate=MIN_RATE_LIMIT, shared=None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate) if rate else min_rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+        self.shared = shared
+        self.synced = float('-inf')
+        self.episode = None  # latest shared cut already applied here
+
+    def acquire(self):
+        """Block until the caller may send one request."""
+        while True:
+            self.sync()
+            with self.lock:
+                now = time.monotonic()
+                if self.rate:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif not self.rate:
+                    return
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(min(wait, RATE_SYNC_SECONDS) if self.shared is not None else wait)
+
+    def sync(self):
+        """Adopt the pause and any rate cut other crawlers shared since the last sync."""
+        with self.lock:
+            now = time.monotonic()
+            if self.shared is None or now - self.synced < RATE_SYNC_SECONDS:
+                return
+            self.synced = now
+        state = self.shared.read()
+        if state is None:
+            return
+        rate, pause, episode = state
+        with self.lock:
+            now = time.monotonic()
+            if pause > 0 and now + pause > self.paused_until:
+                self.paused_until = now + pause
+                self.tokens = 0.0
+            # Cuts recorded before this process started are history, not a throttling episode
+            if self.episode is not None and episode != self.episode and rate is not None and self.rate:
+                if rate < self.rate:
+                    self.rate = max(self.min_rate, rate)
+                    self.last_decrease = now
+                    log.warning(f"[RATE] Another crawler was throttled. Rate limit lowered to {self.rate:.2f} req/s.")
+            self.episode = episode
+
+    def on_success(self):
+        with self.lock:
+            if self.rate:
+                self.rate = min(self.max_rate, self.rate + RATE_INCREASE)
+
+    def on_throttle(self, pause):
+        """Slow every worker down after a 429/503 and hold them all for `pause` seconds."""
+        cut = None
+        with self.lock:
+            now = time.monotonic()
+            # Concurrent requests throttled by the same episode only cut the rate once
+            if self.rate and now - self.last_decrease >= 1.0 / self.rate:
+                self.rate = max(self.min_rate, self.rate * RATE_DECREASE)
+                self.last_decrease = now
+                cut = self.rate
+                log.warning(f"[RATE] Throttled by the API. Rate limit lowered to {self.rate:.2f} req/s.")
+            self.paused_until = max(self.paused_until, now + pause)
+            self.tokens = 0.0
+        if self.shared is not None:
+            episode = self.shared.publish(pause, cut)
+            if episode is not None and cut is not None:
+                with self.lock:
+                    self.episode = episode
+
+rate_limiter = RateLimiter()
+
+class HttpSession:
+    """
+    Keep-alive session shared by every JustGiving call, with a bounded connection pool
+    and gzip/deflate negotiation. Counts requests, connections and bytes so the
+    connection reuse rate can be checked.
+    """
+    def __init__(self, pool_size=HTTP_POOL_SIZE):
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+        self.lock = threading.Lock()
+        self.bytes_received = 0
+
+    def get(self, url, **kwargs):
+        response = self.session.get(url, **kwargs)
+        # Bytes read off the wire, i.e. before gzip/deflate decoding
+        received = response.raw.tell() if response.raw is not None else len(response.content)
+        with self.lock:
+            self.bytes_received += received
+        return response
+
+    def stats(self):
+        requests_sent = connections_opened = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                requests_sent += pool.num_requests
+                connections_opened += pool.num_connections
+        with self.lock:
+            bytes_received = self.bytes_received
+        return {
+            'requests': requests_sent,
+            'connections_opened': connections_opened,
+            'connections_reused': max(0, requests_sent - connections_opened),
+            'bytes_received': bytes_received,
+        }
+
+http_session = HttpSession()
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response, replayed from the response cache."""
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {}
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+class ResponseCache:
+    """
+    Persistent cache of API responses in a SQLite file, keyed by URL and query params.
+    Bodies are stored zlib-compressed; entries older than `ttl_hours` are re-requested and
+    the least recently used ones are evicted once the cache grows past `max_mb`.
+    In `offline` mode expired entries are still served and misses never reach the network,
+    so a crawl can be replayed entirely from the cache.
+    """
+    def __init__(self, path, ttl_hours=CACHE_TTL_HOURS, max_mb=CACHE_MAX_MB, offline=False):
+        self.ttl = ttl_hours * 3600
+        self.max_bytes = max_mb * 1024 * 1024
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                status INTEGER,
+                body BLOB,
+                size INTEGER,
+                stored_at REAL,
+                accessed_at REAL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def key(url, params):
+        return hashlib.sha256(json.dumps([url, sorted((params or {}).items())], default=str).encode('utf-8')).hexdigest()
+
+    def get(self, url, params=None):
+        key = self.key(url, params)
+        with self.lock:
+            row = self.db.execute("SELECT status, body, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (not self.offline and time.time() - row[2] > self.ttl):
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+        return CachedResponse(row[0], zlib.decompress(row[1]))
+
+    def put(self, url, params, response):
+        key = self.key(url, params)
+        body = zlib.compress(response.content)
+        now = time.time()
+        with self.lock:
+            old = self.db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                            (key, response.status_code, body, len(body), now, now))
+            self.total_bytes += len(body) - (old[0] if old else 0)
+            while self.total_bytes > self.max_bytes:
+                oldest = self.db.execute("SELECT key, size FROM responses ORDER BY accessed_at LIMIT 100").fetchall()
+                if not oldest:
+                    break
+                self.db.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k, _ in oldest])
+                self.total_bytes -= sum(size for _, size in oldest)
+
+response_cache = None  # optional ResponseCache (--cache)
+
+def parse_retry_after(value):
+    """Return the delay in seconds requested by a Retry-After header, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+def request_with_retries(url, headers=None, params=None, use_cache=True):
+    """
+    Perform a GET request through the shared rate limiter, with exponential backoff
+    for retryable errors. If a response cache is configured it is consulted first
+    (unless `use_cache` is False) and stores every 200 and 404 response.
+    """
+    endpoint = 'search' if url.endswith('/search') else 'details'
+    if response_cache is not None and (use_cache or response_cache.offline):
+        cached = response_cache.get(url, params)
+        if cached is not None:
+            log.debug("[CACHE] Hit: GET %s with params=%s", url, params)
+            metrics.inc('justgiving_cache_hits_total', endpoint=endpoint)
+            return cached
+        if response_cache.offline:
+            log.warning(f"[CACHE] Miss in offline mode, not requesting: GET {url} with params={params}")
+            return None
 
-def request_with_retries(url, headers=None, params=None):
-    """Perform a GET request with exponential backoff for retryable errors."""
     backoff = INITIAL_BACKOFF
     for attempt in range(1, MAX_RETRIES+1):
         try:
-            print(f"[HTTP] Attempt {attempt}: GET {url} with params={params}")
-            response = requests.get(url, headers=headers, params=params, timeout=30)
+            rate_limiter.acquire()
+            log.debug("[HTTP] Attempt %d: GET %s with params=%s", attempt, url, params)
+            started = time.perf_counter()
+            response = http_session.get(url, headers=headers, params=params, timeout=30)
+            metrics.observe('justgiving_http_request_seconds', time.perf_counter() - started, endpoint=endpoint)
+            metrics.inc('justgiving_http_responses_total', endpoint=endpoint, status=response.status_code)
             
             if response.status_code == 200:
-                print("[HTTP] 200 OK - returning response.")
+                log.debug("[HTTP] 200 OK - returning response.")
+                rate_limiter.on_success()
+                if response_cache is not None:
+                    response_cache.put(url, params, response)
                 return response
             
             elif response.status_code in (429, 503):
-                print(f"[HTTP] {response.status_code} - Rate limit or temporary issue. Backing off {backoff:.1f}s...")
-                time.sleep(backoff)
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                pause = retry_after if retry_after is not None else backoff
+                log.warning(f"[HTTP] {response.status_code} - Rate limit or temporary issue. Pausing all requests {pause:.1f}s...")
+                rate_limiter.on_throttle(pause)
+                metrics.inc('justgiving_http_retries_total', endpoint=endpoint, reason='throttled')
                 backoff *= 2
                 continue  # retry
                 
             elif response.status_code in (401, 403):
                 # Unlikely if you have a valid APP_ID; treat as non-recoverable
-                print(f"[HTTP] {response.status_code} - Unauthorized or forbidden. Cannot proceed.")
+                log.warning(f"[HTTP] {response.status_code} - Unauthorized or forbidden. Cannot proceed.")
                 return response
             
             elif 400 <= response.status_code < 500:
                 # 4xx (client error): probably not retryable
-                print(f"[HTTP] {response.status_code} Client Error - Non-recoverable. {response.text}")
+                log.warning(f"[HTTP] {response.status_code} Client Error - Non-recoverable. {response.text}")
+                if response.status_code == 404 and response_cache is not None:
+                    response_cache.put(url, params, response)
                 return response
             
             elif 500 <= response.status_code < 600:
                 # 5xx (server error) - may or may not be retryable
-                print(f"[HTTP] {response.status_code} Server Error. Backing off {backoff:.1f}s before retry.")
+                log.warning(f"[HTTP] {response.status_code} Server Error. Backing off {backoff:.1f}s before retry.")
+                metrics.inc('justgiving_http_retries_total', endpoint=endpoint, reason='server_error')
                 time.sleep(backoff)
                 backoff *= 2
                 continue
             
             else:
                 # Some other status code
-                print(f"[HTTP] Non-recoverable status {response.status_code}.")
+                log.warning(f"[HTTP] Non-recoverable status {response.status_code}.")
                 return response
         
         except requests.exceptions.RequestException as e:
-            print(f"[HTTP] RequestException on attempt {attempt}: {e}. Backing off {backoff:.1f}s...")
+            log.warning(f"[HTTP] RequestException on attempt {attempt}: {e}. Backing off {backoff:.1f}s...")
+            metrics.inc('justgiving_http_retries_total', endpoint=endpoint, reason='exception')
             time.sleep(backoff)
             backoff *= 2
     
-    print("[HTTP] Max retries exceeded, returning None.")
+    log.warning("[HTTP] Max retries exceeded, returning None.")
+    metrics.inc('justgiving_http_failures_total', endpoint=endpoint)
     return None
 
 def get_crowdfunding_pages(query, page=1, page_size=PAGE_SIZE):
@@ -114,43 +619,51 @@ def get_crowdfunding_pages(query, page=1, page_size=PAGE_SIZE):
     headers = {'Accept': 'application/json'}
 
     response = request_with_retries(url, headers=headers, params=params)
-    if not response:
-        print(f"[SEARCH] No response for query='{query}', page={page}.")
+    if response is None:
+        log.warning(f"[SEARCH] No response for query='{query}', page={page}.")
         return None
     
     if response.status_code != 200:
-        print(f"[SEARCH] Non-200 status {response.status_code} for query='{query}', page={page}.")
+        log.warning(f"[SEARCH] Non-200 status {response.status_code} for query='{query}', page={page}.")
         return None
     
     try:
         data = response.json()
         return data
     except ValueError as e:
-        print(f"[SEARCH] Error parsing JSON for query='{query}', page={page}: {e}")
+        log.warning(f"[SEARCH] Error parsing JSON for query='{query}', page={page}: {e}")
         return None
 
-def get_crowdfunding_page_details(page_short_name):
-    """Fetch the details for an individual crowdfunding page."""
+def fetch_page_details(page_short_name, fresh=False):
+    """
+    Fetch the details for an individual crowdfunding page (bypassing the cache if `fresh`).
+    Returns (status, details): the HTTP status (None if no response came back) and the
+    page details, which are None unless the page was fetched and parsed.
+    """
     url = f'{BASE_URL}/v1/fundraising/pages/{page_short_name}'
     headers = {'Accept': 'application/json'}
 
-    response = request_with_retries(url, headers=headers)
-    if not response:
-        print(f"[DETAILS] No response for page='{page_short_name}'.")
-        return None
+    response = request_with_retries(url, headers=headers, use_cache=not fresh)
+    if response is None:
+        log.warning(f"[DETAILS] No response for page='{page_short_name}'.")
+        return None, None
     
     if response.status_code != 200:
         if response.status_code == 404:
-            print(f"[DETAILS] Page '{page_short_name}' not found (404). Skipping.")
-            return None
-        print(f"[DETAILS] Non-recoverable error {response.status_code} for page '{page_short_name}': {response.text}")
-        return None
+            log.debug("[DETAILS] Page '%s' not found (404). Skipping.", page_short_name)
+            return 404, None
+        log.warning(f"[DETAILS] Non-recoverable error {response.status_code} for page '{page_short_name}': {response.text}")
+        return response.status_code, None
     
     try:
-        return response.json()
+        return 200, response.json()
     except ValueError as e:
-        print(f"[DETAILS] Error parsing JSON for page='{page_short_name}': {e}")
-        return None
+        log.warning(f"[DETAILS] Error parsing JSON for page='{page_short_name}': {e}")
+        return 200, None
+
+def get_crowdfunding_page_details(page_short_name, fresh=False):
+    """Fetch the details for an individual crowdfunding page, or None if it could not be fetched."""
+    return fetch_page_details(page_short_name, fresh)[1]
 
 def extract_page_short_name(page_url):
     """Extract short name from a page URL."""
@@ -158,15 +671,122 @@ def extract_page_short_name(page_url):
         return None
     return page_url.strip('/').split('/')[-1]
 
-def save_data_to_db(page_short_name, page_details):
-    """Save page data to the 'crowdfunding' table."""
-    print(f"[DB] Saving '{page_short_name}' to the database (ON CONFLICT DO NOTHING).")
-    cursor.execute("""
-        INSERT INTO crowdfunding (short_name, details)
-        VALUES (%s, %s)
+@contextmanager
+def transaction():
+    """Run the statements issued on the shared cursor inside one transaction."""
+    cursor.execute("BEGIN;")
+    try:
+        yield
+    except Exception:
+        cursor.execute("ROLLBACK;")
+        raise
+    cursor.execute("COMMIT;")
+
+def content_hash(page_details):
+    """Stable hash of a page's details, used to detect changed pages on refresh."""
+    return hashlib.sha256(json.dumps(page_details, sort_keys=True).encode('utf-8')).hexdigest()
+
+def save_batch_to_db(rows):
+    """Save (short_name, details) rows to the 'crowdfunding' table with multi-row INSERTs."""
+    log.debug("[DB] Saving %d pages to the database (ON CONFLICT DO NOTHING).", len(rows))
+    execute_values(cursor, """
+        INSERT INTO crowdfunding (short_name, details, fetched_at, content_hash)
+        VALUES %s
         ON CONFLICT (short_name)
         DO NOTHING;
-    """, (page_short_name, json.dumps(page_details)))
+    """, [(page_short_name, json.dumps(page_details), content_hash(page_details))
+          for page_short_name, page_details in rows],
+        template="(%s, %s, now(), %s)", page_size=WRITE_BATCH_SIZE)
+
+def upsert_changed_pages(rows):
+    """Store refreshed (short_name, details) rows, rewriting only those whose content changed."""
+    log.debug("[DB] Updating %d changed pages.", len(rows))
+    execute_values(cursor, """
+        INSERT INTO crowdfunding (short_name, details, fetched_at, content_hash)
+        VALUES %s
+        ON CONFLICT (short_name)
+        DO UPDATE SET
+            details = EXCLUDED.details,
+            fetched_at = EXCLUDED.fetched_at,
+            content_hash = EXCLUDED.content_hash
+        WHERE crowdfunding.content_hash IS DISTINCT FROM EXCLUDED.content_hash;
+    """, [(page_short_name, json.dumps(page_details), content_hash(page_details))
+          for page_short_name, page_details in rows],
+        template="(%s, %s, now(), %s)", page_size=WRITE_BATCH_SIZE)
+
+def touch_pages(short_names):
+    """Mark pages as fetched now without rewriting their details."""
+    cursor.execute("UPDATE crowdfunding SET fetched_at = now() WHERE short_name = ANY(%s)", (short_names,))
+
+pending_short_names = set()  # short names held by a write buffer and not committed yet
+
+class PageWriteBuffer:
+    """
+    Write-behind buffer for the pages crawled by one query. Rows are flushed in batches,
+    each in a single transaction together with the 'query_state' advance of the search
+    pages they came from, so a search page is never marked done before its rows are durable.
+    Until then their short names are in `pending_short_names`, so the other queries of the
+    process do not fetch them again. In --worker mode every completed search page also
+    renews the worker's lease.
+    """
+    def __init__(self, query, depth):
+        self.query = query
+        self.depth = depth
+        self.rows = []
+        self.next_page = None
+        self.pending_pages = 0
+        self.children = []  # refined (query, depth) pairs queued when the query completes
+
+    def add(self, page_short_name, page_details):
+        self.rows.append((page_short_name, page_details))
+        pending_short_names.add(page_short_name)
+
+    def discard(self):
+        """Drop the rows not flushed yet, leaving their pages to be fetched by whoever needs them."""
+        pending_short_names.difference_update(page_short_name for page_short_name, _ in self.rows)
+        self.rows = []
+
+    def page_done(self, next_page):
+        """Record that a search page is complete; flush once enough work is pending."""
+        self.next_page = next_page
+        self.pending_pages += 1
+        metrics.inc('justgiving_search_pages_total')
+        if len(self.rows) >= WRITE_BATCH_SIZE or self.pending_pages >= FLUSH_EVERY_PAGES:
+            self.flush()
+        elif worker_id is not None:
+            try:
+                renew_lease(self.query)
+            except LeaseLost:
+                self.discard()
+                raise
+
+    def flush(self, fully_processed=False):
+        if not self.rows and self.next_page is None and not fully_processed:
+            return
+        started = time.perf_counter()
+        short_names = [page_short_name for page_short_name, _ in self.rows]
+        try:
+            with transaction():
+                if worker_id is not None:
+                    renew_lease(self.query)
+                if self.rows:
+                    save_batch_to_db(self.rows)
+                if fully_processed:
+                    update_query_state(self.query, self.depth, fully_processed=True)
+                    if self.children:
+                        enqueue_queries(self.children)
+                else:
+                    update_query_state(self.query, self.depth, self.next_page)
+        finally:
+            # Committed rows are found in the table from now on; rolled back ones may be fetched again
+            pending_short_names.difference_update(short_names)
+        metrics.observe('justgiving_db_write_seconds', time.perf_counter() - started)
+        metrics.inc('justgiving_pages_saved_total', len(self.rows))
+        if known_short_names is not None:
+            known_short_names.update(short_names)
+        self.rows = []
+        self.next_page = None
+        self.pending_pages = 0
 
 def update_query_state(query, depth, current_page=None, fully_processed=None):
     """Upsert the query state in the 'query_state' table."""
@@ -193,18 +813,98 @@ def get_unfinished_queries():
     cursor.execute("SELECT query, depth, current_page FROM query_state WHERE fully_processed = FALSE")
     return cursor.fetchall()
 
-def download_data_for_query(query, depth):
+worker_id = None  # set in --worker mode; queries are then claimed through leases
+
+class LeaseLost(Exception):
+    """Raised when a worker's lease on a query expired and another worker claimed it."""
+
+def enqueue_queries(queries):
+    """Add (query, depth) pairs to 'query_state' as unfinished, unclaimed queries."""
+    execute_values(cursor, """
+        INSERT INTO query_state (query, depth, current_page, fully_processed)
+        VALUES %s
+        ON CONFLICT (query) DO NOTHING;
+    """, [(query, depth, 1, False) for query, depth in queries])
+
+def claim_query():
     """
-    For a given query, iterate through pages up to MAX_PAGES or totalPages,
-    download each page of results, and store them. Return the total_pages found.
+    Claim the next unfinished query whose lease is free or expired for this worker.
+    Returns (query, depth), or None if nothing can be claimed right now.
+    """
+    cursor.execute("""
+        UPDATE query_state
+        SET claimed_by = %s, lease_expires = now() + %s * interval '1 second'
+        WHERE query = (
+            SELECT query FROM query_state
+            WHERE fully_processed = FALSE
+              AND (lease_expires IS NULL OR lease_expires < now())
+            ORDER BY depth, query
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING query, depth;
+    """, (worker_id, LEASE_SECONDS))
+    return cursor.fetchone()
+
+def renew_lease(query, lease_cursor=None):
+    """Heartbeat: extend this worker's lease on `query`, or raise LeaseLost if it was taken over."""
+    lease_cursor = lease_cursor or cursor
+    lease_cursor.execute("""
+        UPDATE query_state
+        SET lease_expires = now() + %s * interval '1 second'
+        WHERE query = %s AND claimed_by = %s;
+    """, (LEASE_SECONDS, query, worker_id))
+    if lease_cursor.rowcount == 0:
+        raise LeaseLost(f"Lease on query '{query}' was taken over by another worker.")
+
+class LeaseHeartbeat:
+    """
+    Renews this worker's lease on a claimed query every HEARTBEAT_SECONDS from a background
+    thread on its own `connection`, so the lease holds however long a search page takes
+    (100 detail fetches held back by the rate limiter can take minutes). The flushes still
+    renew it in their transaction, which is where a lost lease stops the crawl of the query.
+    """
+    def __init__(self, query, connection):
+        self.query = query
+        self.connection = connection
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='lease-heartbeat', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        with self.connection.cursor() as heartbeat_cursor:
+            while not self.stopped.wait(HEARTBEAT_SECONDS):
+                try:
+                    renew_lease(self.query, heartbeat_cursor)
+                except LeaseLost as e:
+                    log.warning(f"[WORKER] {e}")
+                    return
+                except psycopg2.Error as e:
+                    log.warning(f"[WORKER] Could not renew the lease on query '{self.query}': {e}")
+
+def has_unfinished_queries():
+    cursor.execute("SELECT 1 FROM query_state WHERE fully_processed = FALSE LIMIT 1")
+    return cursor.fetchone() is not None
+
+def start_query(query, depth):
+    """
+    Look up (or create) the 'query_state' row for `query` and return the
+    (depth, current_page) to resume from, or None if it is already fully processed.
     """
     state = get_query_state(query)
     if state is not None:
         stored_depth, start_page, done = state
         # If query was fully_processed before, return immediately
         if done:
-            print(f"[QUERY] Query '{query}' is already marked fully processed. Skipping.")
-            return 0
+            log.info(f"[QUERY] Query '{query}' is already marked fully processed. Skipping.")
+            return None
         current_page = start_page if start_page else 1
         if depth < stored_depth:
             # Possibly an older depth? We'll trust the DB's depth
@@ -212,99 +912,555 @@ def download_data_for_query(query, depth):
     else:
         current_page = 1
         update_query_state(query, depth, current_page)
+    return depth, current_page
+
+def page_short_names(fundraising_pages):
+    """Extract the unique short names from a page of search results, in order."""
+    short_names = []
+    for page_data in fundraising_pages:
+        page_short_name = extract_page_short_name(page_data.get('PageUrl'))
+        if not page_short_name:
+            log.debug("[QUERY] No valid PageUrl found or empty short_name.")
+            continue
+        short_names.append(page_short_name)
+    return list(dict.fromkeys(short_names))
+
+known_short_names = None  # optional in-process set of stored short names (--preload-known)
+
+def preload_known_short_names():
+    """Load every short name already in 'crowdfunding' into the in-process dedup set."""
+    global known_short_names
+    log.info("[DEDUP] Preloading known short names from 'crowdfunding'...")
+    cursor.execute("SELECT short_name FROM crowdfunding")
+    known_short_names = {row[0] for row in cursor.fetchall()}
+    log.info(f"[DEDUP] {len(known_short_names)} known short names loaded.")
+
+def filter_new_short_names(short_names):
+    """
+    Return the short names not yet stored in 'crowdfunding' nor waiting in a write buffer.
+    The in-process set (if preloaded) answers known names; the rest are checked with a
+    single database query.
+    """
+    candidates = [sn for sn in short_names if sn not in pending_short_names]
+    if known_short_names is not None:
+        candidates = [sn for sn in short_names if sn not in known_short_names]
+
+    in_db = set()
+    if candidates:
+        started = time.perf_counter()
+        cursor.execute("SELECT short_name FROM crowdfunding WHERE short_name = ANY(%s)", (candidates,))
+        in_db = {row[0] for row in cursor.fetchall()}
+        metrics.observe('justgiving_db_dedup_seconds', time.perf_counter() - started)
+        if known_short_names is not None:
+            known_short_names.update(in_db)
+
+    new_short_names = [sn for sn in candidates if sn not in in_db]
+    skipped = len(short_names) - len(new_short_names)
+    metrics.inc('justgiving_pages_skipped_total', skipped)
+    if skipped:
+        log.debug("[QUERY] %d of %d pages already in DB. Skipping them.", skipped, len(short_names))
+    return new_short_names
+
+def download_data_for_query(query, depth, refine_into_queue=False):
+    """
+    For a given query, iterate through pages up to MAX_PAGES or totalPages,
+    download each page of results, and store them. Return the total_pages found.
+    With `refine_into_queue`, the refined child queries of an oversized query are
+    added to 'query_state' in the same transaction that marks it fully processed.
+    """
+    start = start_query(query, depth)
+    if start is None:
+        return 0
+    depth, current_page = start
 
     total_pages = None
-    print(f"[QUERY] Processing query='{query}' at depth={depth} starting from page={current_page}")
+    buffer = PageWriteBuffer(query, depth)
+    log.info(f"[QUERY] Processing query='{query}' at depth={depth} starting from page={current_page}")
 
     while True:
         if current_page > MAX_PAGES:
-            print(f"[QUERY] Reached MAX_PAGES={MAX_PAGES} limit for query='{query}' at page={current_page}.")
+            log.info(f"[QUERY] Reached MAX_PAGES={MAX_PAGES} limit for query='{query}' at page={current_page}.")
             break
 
-        print(f"[QUERY] Fetching search results for query='{query}', page={current_page}")
+        log.debug("[QUERY] Fetching search results for query='%s', page=%d", query, current_page)
         search_results = get_crowdfunding_pages(query=query, page=current_page, page_size=PAGE_SIZE)
         if not search_results or 'SearchResults' not in search_results:
-            print(f"[QUERY] No valid search results for query='{query}', page={current_page}. Stopping.")
+            log.info(f"[QUERY] No valid search results for query='{query}', page={current_page}. Stopping.")
             break
 
         fundraising_pages = search_results['SearchResults']
         if not fundraising_pages:
-            print(f"[QUERY] SearchResults is empty for query='{query}', page={current_page}. Stopping.")
+            log.info(f"[QUERY] SearchResults is empty for query='{query}', page={current_page}. Stopping.")
             break
 
         # Set total_pages once
         if total_pages is None:
             total_pages = search_results.get('totalPages', 1)
-            print(f"[QUERY] totalPages={total_pages} for query='{query}'")
-
-        # Process each page
-        for page_data in fundraising_pages:
-            page_url = page_data.get('PageUrl')
-            page_short_name = extract_page_short_name(page_url)
-            if not page_short_name:
-                print("[QUERY] No valid PageUrl found or empty short_name.")
-                continue
-
-            # Check if already in DB
-            cursor.execute("SELECT 1 FROM crowdfunding WHERE short_name = %s", (page_short_name,))
-            if cursor.fetchone():
-                print(f"[QUERY] Page '{page_short_name}' already in DB. Skipping.")
-                continue
+            log.info(f"[QUERY] totalPages={total_pages} for query='{query}'")
+            if refine_into_queue and total_pages >= MAX_PAGES_THRESHOLD and depth < MAX_RECURSION_DEPTH:
+                buffer.children = [(q, depth + 1) for q in refine_query(query)]
 
+        # Process each page not already in DB
+        for page_short_name in filter_new_short_names(page_short_names(fundraising_pages)):
             details = get_crowdfunding_page_details(page_short_name)
             if details:
-                save_data_to_db(page_short_name, details)
+                buffer.add(page_short_name, details)
 
-        # Update query state after successfully processing this page
-        update_query_state(query, depth, current_page + 1)
+        # Advance query state (flushed with this page's rows) after processing this page
+        buffer.page_done(current_page + 1)
         current_page += 1
 
         # If we've reached the last page, stop
         if current_page > total_pages:
-            print(f"[QUERY] Processed all {total_pages} pages for query='{query}'.")
+            log.info(f"[QUERY] Processed all {total_pages} pages for query='{query}'.")
             break
 
-    # Mark query as fully processed
-    update_query_state(query, depth, fully_processed=True)
-    print(f"[QUERY] Marking query='{query}' as fully processed.")
+    # Flush the remaining rows and mark query as fully processed in one transaction
+    buffer.flush(fully_processed=True)
+    log.info(f"[QUERY] Marking query='{query}' as fully processed.")
 
     return total_pages if total_pages else 0
 
 def refine_query(query):
     return [query + letter for letter in string.ascii_lowercase]
 
-def get_all_data(query, depth=1):
+def get_all_data(query, depth=1, refine=True):
     """
-    Downloads data for `query`, then if it exceeds MAX_PAGES_THRESHOLD, refines further.
+    Downloads data for `query`, then if it exceeds MAX_PAGES_THRESHOLD, refines further
+    (unless `refine` is False, as for queries chosen by the planner).
     """
     total_pages = download_data_for_query(query, depth) or 0
 
     # If the search results are too large, refine the query if we haven't hit max recursion depth
-    if total_pages >= MAX_PAGES_THRESHOLD and depth < MAX_RECURSION_DEPTH:
-        print(f"[REFINE] Query='{query}' has {total_pages} pages >= threshold {MAX_PAGES_THRESHOLD}. Refining...")
+    if refine and total_pages >= MAX_PAGES_THRESHOLD and depth < MAX_RECURSION_DEPTH:
+        log.info(f"[REFINE] Query='{query}' has {total_pages} pages >= threshold {MAX_PAGES_THRESHOLD}. Refining...")
         for q in refine_query(query):
             get_all_data(q, depth+1)
 
-def main():
-    """Main entry point for the script."""
-    # Check for --reset-state argument (but do NOT truncate 'crowdfunding')
-    if '--reset-state' in sys.argv:
-        reset_query_state()
+def probe_total_pages(query):
+    """
+    Return how many PAGE_SIZE search pages `query` has, using a single page-1 request
+    with a page size of one (so 'totalPages' is the number of results).
+    Returns None if the probe failed.
+    """
+    search_results = get_crowdfunding_pages(query=query, page=1, page_size=1)
+    if search_results is None:
+        return None
+    if not search_results.get('SearchResults'):
+        return 0
+    return math.ceil(search_results.get('totalPages', 1) / PAGE_SIZE)
+
+def plan_queries(roots, concurrency=1):
+    """
+    Probe result counts and choose the queries to download, before downloading anything.
+    A query that fits in MAX_PAGES is downloaded whole. A larger one is split over
+    QUERY_ALPHABET while MAX_RECURSION_DEPTH allows it and the split actually narrows the
+    results. Short names contain only QUERY_ALPHABET characters, so a result of a split query
+    is a result of one of its children unless the match ends its short name; a name is still
+    found through the query starting at its first letter once it has MAX_RECURSION_DEPTH
+    characters from there on. Split queries are therefore not downloaded themselves.
+    Returns the (query, depth) pairs to download.
+    """
+    queries = []
+    splits = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        root_pages = executor.map(probe_total_pages, [q for q, _ in roots])
+        level = [(q, d, pages) for (q, d), pages in zip(roots, root_pages)]
+        while level:
+            next_level = []
+            for query, depth, pages in level:
+                if pages == 0:
+                    continue
+                if pages is None or pages <= MAX_PAGES or depth >= MAX_RECURSION_DEPTH:
+                    if pages is not None and pages > MAX_PAGES:
+                        log.warning(f"[PLAN] Query='{query}' has {pages} pages; only MAX_PAGES={MAX_PAGES} will be downloaded.")
+                    queries.append((query, depth))
+                    continue
+
+                children = [query + ch for ch in QUERY_ALPHABET]
+                if depth + 1 < MAX_RECURSION_DEPTH:
+                    child_pages = list(executor.map(probe_total_pages, children))
+                else:
+                    # Children at the last depth are downloaded whatever they hold: a probe
+                    # would cost as much as downloading an empty child does
+                    child_pages = [None] * len(children)
+                if max((p for p in child_pages if p is not None), default=0) >= pages:
+                    # Refining does not narrow this query down; download it as it is
+                    queries.append((query, depth))
+                    continue
+                log.info(f"[PLAN] Query='{query}' has {pages} pages > MAX_PAGES={MAX_PAGES}. Splitting.")
+                splits += 1
+                next_level.extend((c, depth + 1, p) for c, p in zip(children, child_pages))
+            level = next_level
+
+    log.info(f"[PLAN] Planned {len(queries)} queries after splitting {splits}.")
+    return queries
+
+def record_plan(queries):
+    """Store the plan in 'query_state': every planned query as an unfinished query."""
+    with transaction():
+        for query, depth in queries:
+            update_query_state(query, depth, 1)
+
+class RequestPool:
+    """
+    Bounded pool of in-flight API requests shared by every task of an async crawl.
+    The blocking request helpers run on worker threads, at most `concurrency` at a time;
+    all database work stays on the event loop thread.
+    """
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='crawl')
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.claimed_queries = set()
+        self.waiting = 0
+        self.in_flight = 0
+
+    async def run(self, func, *args, **kwargs):
+        self.waiting += 1
+        metrics.set_gauge('justgiving_requests_queued', self.waiting)
+        async with self.semaphore:
+            self.waiting -= 1
+            self.in_flight += 1
+            metrics.set_gauge('justgiving_requests_queued', self.waiting)
+            metrics.set_gauge('justgiving_requests_in_flight', self.in_flight)
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+            finally:
+                self.in_flight -= 1
+                metrics.set_gauge('justgiving_requests_in_flight', self.in_flight)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+async def download_data_for_query_async(pool, query, depth, refine_into_queue=False):
+    """
+    Async counterpart of download_data_for_query. The next search page is prefetched
+    while the details of the current page's results are fetched concurrently through
+    `pool`. 'query_state' is still advanced one page at a time, in order, so a killed
+    crawl resumes exactly where the serial crawl would.
+    """
+    start = start_query(query, depth)
+    if start is None:
+        return 0
+    depth, current_page = start
+
+    total_pages = None
+    log.info(f"[QUERY] Processing query='{query}' at depth={depth} starting from page={current_page}")
+
+    buffer = PageWriteBuffer(query, depth)
+    search_task = None
+    if current_page <= MAX_PAGES:
+        search_task = asyncio.ensure_future(pool.run(get_crowdfunding_pages, query, current_page, PAGE_SIZE))
+
+    while True:
+        if current_page > MAX_PAGES:
+            log.info(f"[QUERY] Reached MAX_PAGES={MAX_PAGES} limit for query='{query}' at page={current_page}.")
+            break
+
+        log.debug("[QUERY] Fetching search results for query='%s', page=%d", query, current_page)
+        search_results = await search_task
+        search_task = None
+        if not search_results or 'SearchResults' not in search_results:
+            log.info(f"[QUERY] No valid search results for query='{query}', page={current_page}. Stopping.")
+            break
+
+        fundraising_pages = search_results['SearchResults']
+        if not fundraising_pages:
+            log.info(f"[QUERY] SearchResults is empty for query='{query}', page={current_page}. Stopping.")
+            break
+
+        # Set total_pages once
+        if total_pages is None:
+            total_pages = search_results.get('totalPages', 1)
+            log.info(f"[QUERY] totalPages={total_pages} for query='{query}'")
+            if refine_into_queue and total_pages >= MAX_PAGES_THRESHOLD and depth < MAX_RECURSION_DEPTH:
+                buffer.children = [(q, depth + 1) for q in refine_query(query)]
+
+        # Prefetch the next search page while this page's details are downloaded
+        next_page = current_page + 1
+        if next_page <= min(total_pages, MAX_PAGES):
+            search_task = asyncio.ensure_future(pool.run(get_crowdfunding_pages, query, next_page, PAGE_SIZE))
+
+        new_short_names = filter_new_short_names(page_short_names(fundraising_pages))
+        all_details = await asyncio.gather(
+            *(pool.run(get_crowdfunding_page_details, sn) for sn in new_short_names)
+        )
+        for page_short_name, details in zip(new_short_names, all_details):
+            if details:
+                buffer.add(page_short_name, details)
+
+        # Advance query state (flushed with this page's rows) after processing this page
+        buffer.page_done(current_page + 1)
+        current_page += 1
+
+        # If we've reached the last page, stop
+        if current_page > total_pages:
+            log.info(f"[QUERY] Processed all {total_pages} pages for query='{query}'.")
+            break
+
+    if search_task is not None:
+        search_task.cancel()
+
+    # Flush the remaining rows and mark query as fully processed in one transaction
+    buffer.flush(fully_processed=True)
+    log.info(f"[QUERY] Marking query='{query}' as fully processed.")
+
+    return total_pages if total_pages else 0
+
+async def get_all_data_async(pool, query, depth=1, refine=True):
+    """
+    Async counterpart of get_all_data: refined child queries are crawled concurrently,
+    sharing the in-flight request limit of `pool`.
+    """
+    # A resumed child query may also be reached again through its parent's refinement
+    if query in pool.claimed_queries:
+        return
+    pool.claimed_queries.add(query)
+
+    total_pages = await download_data_for_query_async(pool, query, depth) or 0
+
+    if refine and total_pages >= MAX_PAGES_THRESHOLD and depth < MAX_RECURSION_DEPTH:
+        log.info(f"[REFINE] Query='{query}' has {total_pages} pages >= threshold {MAX_PAGES_THRESHOLD}. Refining...")
+        await asyncio.gather(*(get_all_data_async(pool, q, depth+1) for q in refine_query(query)))
+
+async def crawl_async(queries, concurrency, refine=True):
+    """Crawl all (query, depth) pairs concurrently with at most `concurrency` requests in flight."""
+    pool = RequestPool(concurrency)
+    try:
+        await asyncio.gather(*(get_all_data_async(pool, q, d, refine) for q, d in queries))
+    finally:
+        pool.close()
+
+def get_stale_pages(max_age_hours, limit, exclude=()):
+    """
+    Return up to `limit` (short_name, content_hash) pairs of active pages not fetched
+    within `max_age_hours`, least recently fetched first, leaving out the `exclude`d names.
+    """
+    cursor.execute("""
+        SELECT short_name, content_hash
+        FROM crowdfunding
+        WHERE (fetched_at IS NULL OR fetched_at < now() - %s * interval '1 hour')
+          AND COALESCE(details->>'status', 'Active') = 'Active'
+          AND NOT (short_name = ANY(%s))
+        ORDER BY fetched_at NULLS FIRST
+        LIMIT %s;
+    """, (max_age_hours, list(exclude), limit))
+    return cursor.fetchall()
+
+def refresh_pages(max_age_hours=REFRESH_MAX_AGE_HOURS, concurrency=1):
+    """
+    Incremental refresh: re-fetch the details of stale active pages, in order of staleness,
+    and rewrite only the pages whose content hash changed. Unchanged pages and pages the
+    API no longer has (404) just have their fetch time updated. Pages that could not be
+    fetched keep their fetch time, so the next refresh tries them again; they are skipped
+    for the rest of this run.
+    """
+    refreshed = changed_total = 0
+    failed = set()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            stale = get_stale_pages(max_age_hours, REFRESH_BATCH_SIZE, failed)
+            if not stale:
+                break
+            short_names = [sn for sn, _ in stale]
+            changed, unchanged = [], []
+            fetch_fresh = functools.partial(fetch_page_details, fresh=True)
+            for (page_short_name, old_hash), (status, details) in zip(stale, executor.map(fetch_fresh, short_names)):
+                if details and content_hash(details) != old_hash:
+                    changed.append((page_short_name, details))
+                elif details or status == 404:
+                    unchanged.append(page_short_name)
+                else:
+                    failed.add(page_short_name)
 
+            with transaction():
+                if changed:
+                    upsert_changed_pages(changed)
+                if unchanged:
+                    touch_pages(unchanged)
+            refreshed += len(changed) + len(unchanged)
+            changed_total += len(changed)
+            log.info(f"[REFRESH] {refreshed} stale pages re-fetched so far, {changed_total} changed, "
+                     f"{len(failed)} failed.")
+
+    log.info(f"[REFRESH] Done. {refreshed} pages re-fetched, {changed_total} updated, "
+             f"{len(failed)} could not be fetched and stay stale.")
+
+async def download_with_pool(query, depth, concurrency, refine_into_queue):
+    pool = RequestPool(concurrency)
+    try:
+        return await download_data_for_query_async(pool, query, depth, refine_into_queue)
+    finally:
+        pool.close()
+
+def seed_worker_queries(plan=False, concurrency=1):
+    """
+    Seed 'query_state' for workers unless a crawl is already recorded: the planned
+    queries with `plan`, the single-letter queries otherwise. An advisory lock makes
+    sure only the first worker to start does it.
+    """
+    cursor.execute("SELECT pg_advisory_lock(%s)", (WORKER_SEED_LOCK,))
+    try:
+        cursor.execute("SELECT 1 FROM query_state LIMIT 1")
+        if cursor.fetchone() is not None:
+            return
+        if plan:
+            log.info("[WORKER] Empty query state. Planning the query space before downloading.")
+            record_plan(plan_queries([(letter, 1) for letter in LETTERS], concurrency))
+        else:
+            log.info("[WORKER] Empty query state. Seeding single-letter queries.")
+            enqueue_queries([(letter, 1) for letter in LETTERS])
+    finally:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", (WORKER_SEED_LOCK,))
+
+def run_worker(concurrency=1, plan=False):
+    """
+    Worker mode: claim queries from 'query_state' one at a time with
+    SELECT ... FOR UPDATE SKIP LOCKED and crawl them until none are left. Refined child
+    queries are queued for any worker to claim. A heartbeat renews the lease on the claimed
+    query; a claim whose lease is not renewed within LEASE_SECONDS returns to the pool.
+    Planned queries are never refined.
+    """
+    log.info(f"[WORKER] Worker '{worker_id}' starting.")
+    seed_worker_queries(plan, concurrency)
+    refine = not plan
+    heartbeat_conn = connect()
+
+    while True:
+        claim = claim_query()
+        if claim is None:
+            if not has_unfinished_queries():
+                break
+            log.info(f"[WORKER] All unfinished queries are claimed. Waiting {WORKER_POLL_SECONDS}s...")
+            time.sleep(WORKER_POLL_SECONDS)
+            continue
+
+        query, depth = claim
+        log.info(f"[WORKER] Claimed query='{query}' at depth={depth}.")
+        try:
+            with LeaseHeartbeat(query, heartbeat_conn):
+                if concurrency > 1:
+                    asyncio.run(download_with_pool(query, depth, concurrency, refine))
+                else:
+                    download_data_for_query(query, depth, refine_into_queue=refine)
+        except LeaseLost as e:
+            log.warning(f"[WORKER] {e} Moving on.")
+
+    heartbeat_conn.close()
+    log.info(f"[WORKER] Worker '{worker_id}' found no more queries to claim.")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fetch active JustGiving crowdfunding pages into PostgreSQL.")
+    parser.add_argument('--reset-state', action='store_true',
+                        help="Truncate 'query_state' (but not 'crowdfunding') before crawling.")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="Maximum number of in-flight API requests. Values above 1 use the async crawl engine.")
+    parser.add_argument('--rate-limit', type=float, default=RATE_LIMIT,
+                        help="Request budget in requests/second shared by all workers; 0 disables it "
+                             "(429/503 responses still pause every worker).")
+    parser.add_argument('--pool-size', type=int, default=HTTP_POOL_SIZE,
+                        help="Keep-alive connections held open to the API (raised to --concurrency if lower).")
+    parser.add_argument('--plan', action='store_true',
+                        help="On a fresh start, probe result counts first, split queries too large for MAX_PAGES "
+                             "over letters, digits and '-', and download the planned queries without refining them further.")
+    parser.add_argument('--worker', action='store_true',
+                        help="Run as one of several crawl workers that claim queries from 'query_state' "
+                             "with leases, so processes on any host can share the crawl.")
+    parser.add_argument('--worker-id', default=f"{socket.gethostname()}:{os.getpid()}",
+                        help="Identifier recorded on claimed queries (default: host:pid).")
+    parser.add_argument('--refresh', action='store_true',
+                        help="Instead of crawling, re-fetch stale active pages already in 'crowdfunding' "
+                             "and update those whose content changed.")
+    parser.add_argument('--max-age-hours', type=float, default=REFRESH_MAX_AGE_HOURS,
+                        help="Age after which a page is stale in --refresh mode.")
+    parser.add_argument('--cache', metavar='PATH',
+                        help="SQLite file caching search and detail responses across runs.")
+    parser.add_argument('--cache-ttl-hours', type=float, default=CACHE_TTL_HOURS,
+                        help="Age after which cached responses are requested again.")
+    parser.add_argument('--cache-max-mb', type=float, default=CACHE_MAX_MB,
+                        help="Cache size above which least recently used responses are evicted.")
+    parser.add_argument('--offline', action='store_true',
+                        help="Replay the crawl from --cache only, ignoring its TTL and never calling the API.")
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="Logging level; per-request messages are logged at DEBUG.")
+    parser.add_argument('--metrics-port', type=int,
+                        help="Serve Prometheus-style metrics on this port at /metrics.")
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help=f"Write a JSON metrics snapshot to PATH every {METRICS_INTERVAL}s and at exit.")
+    parser.add_argument('--preload-known', action='store_true',
+                        help="Preload all stored short names into memory so most 'already crawled' "
+                             "checks never reach the database.")
+    return parser.parse_args()
+
+def crawl(args):
+    """Search crawl: resume unfinished queries, or start fresh (planned with --plan)."""
     # Resume from unfinished queries if any
     unfinished = get_unfinished_queries()
     if unfinished:
-        print("[MAIN] Resuming unfinished queries...")
+        log.info("[MAIN] Resuming unfinished queries...")
+        queries = []
         for q, d, p in unfinished:
-            print(f"   -> Resuming query='{q}', depth={d}, current_page={p}")
-            get_all_data(q, d)
+            log.info(f"   -> Resuming query='{q}', depth={d}, current_page={p}")
+            queries.append((q, d))
+    elif args.plan:
+        log.info("[MAIN] No unfinished queries found. Planning the query space before downloading.")
+        queries = plan_queries([(letter, 1) for letter in LETTERS], args.concurrency)
+        record_plan(queries)
     else:
-        print("[MAIN] No unfinished queries found. Starting fresh with single-letter queries.")
-        for letter in LETTERS:
-            print(f"   -> Processing query='{letter}' at depth=1")
-            get_all_data(letter, depth=1)
+        log.info("[MAIN] No unfinished queries found. Starting fresh with single-letter queries.")
+        queries = [(letter, 1) for letter in LETTERS]
+
+    # Planned queries are downloaded as they are, without further refinement
+    refine = not args.plan
+    if args.concurrency > 1:
+        log.info(f"[MAIN] Async crawl with up to {args.concurrency} requests in flight.")
+        asyncio.run(crawl_async(queries, args.concurrency, refine))
+    else:
+        for q, d in queries:
+            log.info(f"   -> Processing query='{q}' at depth={d}")
+            get_all_data(q, d, refine)
+
+def main():
+    """Main entry point for the script."""
+    global rate_limiter, http_session, worker_id, response_cache
+    args = parse_args()
+    logging.basicConfig(level=args.log_level, format='%(message)s')
+    if args.offline and not args.cache:
+        raise SystemExit("--offline requires --cache PATH.")
+    if args.cache:
+        response_cache = ResponseCache(args.cache, args.cache_ttl_hours, args.cache_max_mb, args.offline)
+    rate_limiter = RateLimiter(args.rate_limit, shared=SharedThrottle())
+    http_session = HttpSession(max(args.pool_size, args.concurrency))
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+    if args.metrics_file:
+        start_metrics_writer(args.metrics_file)
+
+    # Check for --reset-state argument (but do NOT truncate 'crowdfunding')
+    if args.reset_state:
+        reset_query_state()
+
+    try:
+        if args.refresh:
+            refresh_pages(args.max_age_hours, args.concurrency)
+        else:
+            if args.preload_known:
+                preload_known_short_names()
+            if args.worker:
+                worker_id = args.worker_id
+                run_worker(args.concurrency, plan=args.plan)
+            else:
+                crawl(args)
+    finally:
+        stats = http_session.stats()
+        log.info(f"[HTTP] {stats['requests']} requests over {stats['connections_opened']} connections "
+                 f"({stats['connections_reused']} reused), {stats['bytes_received']} bytes received.")
+        if args.metrics_file:
+            write_metrics_snapshot(args.metrics_file)
 
-    print("[MAIN] All queries completed (or none to process). Exiting.")
+    log.info("[MAIN] All queries completed (or none to process). Exiting.")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,16 @@
+import importlib
+import os
+import sys
+from unittest import mock
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ('analysis', 'search', 'benchmarks'):
+    sys.path.insert(0, os.path.join(REPO_ROOT, directory))
+
+@pytest.fixture(scope='session')
+def justgiving_search():
+    """The search script, imported without a database (its module-level connection is a mock)."""
+    with mock.patch('psycopg2.connect'):
+        return importlib.import_module('justgiving_search')
@@ -0,0 +1,13 @@
+from unittest import mock
+
+import run_benchmarks
+
+def test_clear_tables_creates_the_corpus_table_first(justgiving_search, monkeypatch):
+    conn = mock.MagicMock()
+    monkeypatch.setattr('sentiment_analysis.get_db_connection', lambda: conn)
+    run_benchmarks.clear_tables('crowdfunding', 'query_state', 'benchmark_corpus')
+
+    executed = conn.cursor.return_value.__enter__.return_value.execute.call_args_list
+    statements = [' '.join(c.args[0].split()) for c in executed]
+    assert statements == ['CREATE TABLE IF NOT EXISTS benchmark_corpus (seed INT, size INT);',
+                          'TRUNCATE crowdfunding, query_state, benchmark_corpus;']
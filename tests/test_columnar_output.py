@@ -0,0 +1,38 @@
+import sys
+
+import pandas as pd
+import pytest
+
+from sentiment_analysis import write_columnar
+
+def scores():
+    return pd.DataFrame({'short_name': ['a', 'b', 'c'], 'story_id': [0, 1, 2],
+                         'category_x': [0.1, 0.2, 0.3], 'theme_y': [1.0, 0.0, 0.5], 'story': ['s1', 's2', 's3']})
+
+@pytest.mark.parametrize('output_format', ['parquet', 'arrow'])
+def test_written_in_row_groups(tmp_path, output_format):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+    path = str(tmp_path / f'scores.{output_format}')
+    write_columnar(scores(), path, output_format, row_group_size=2)
+
+    if output_format == 'parquet':
+        assert pq.ParquetFile(path).num_row_groups == 2
+        table = pq.read_table(path)
+    else:
+        reader = pa.ipc.open_file(path)
+        assert reader.num_record_batches == 2
+        table = reader.read_all()
+    assert table.column_names == ['short_name', 'story_id', 'category_x', 'theme_y']
+    assert table.to_pandas().equals(scores().drop(columns='story'))
+
+def test_missing_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    with pytest.raises(SystemExit, match=r"needs pyarrow \(pip install 'pyarrow==17.0.0'\)"):
+        write_columnar(scores(), str(tmp_path / 'scores.parquet'), 'parquet')
+
+def test_broken_pyarrow_reports_the_import_error(tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    monkeypatch.setitem(sys.modules, 'pyarrow.parquet', None)
+    with pytest.raises(SystemExit, match=r"pyarrow is installed but failed to import \(.*pyarrow\.parquet"):
+        write_columnar(scores(), str(tmp_path / 'scores.parquet'), 'parquet')
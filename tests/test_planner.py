@@ -0,0 +1,70 @@
+import pytest
+
+from fake_justgiving import FakeJustGiving
+
+@pytest.fixture
+def fake_api(justgiving_search, monkeypatch):
+    """Route the search script's search requests to an in-process fake API, counting them."""
+    api = FakeJustGiving(3000, seed=7)
+    api.requests = 0
+
+    def get_crowdfunding_pages(query, page=1, page_size=justgiving_search.PAGE_SIZE):
+        api.requests += 1
+        return api.search({'q': [query], 'page': [str(page)], 'pageSize': [str(page_size)]})
+
+    monkeypatch.setattr(justgiving_search, 'get_crowdfunding_pages', get_crowdfunding_pages)
+    monkeypatch.setattr(justgiving_search, 'MAX_PAGES', 3)  # queries of 300+ results are split
+    monkeypatch.setattr(justgiving_search, 'MAX_PAGES_THRESHOLD', 2)
+    return api
+
+def downloaded(justgiving_search, queries):
+    """Short names the search pages of `queries` list, paged as download_data_for_query does."""
+    short_names = set()
+    for query, _ in queries:
+        page = 1
+        while page <= justgiving_search.MAX_PAGES:
+            results = justgiving_search.get_crowdfunding_pages(query, page)
+            short_names.update(justgiving_search.page_short_names(results['SearchResults']))
+            if page >= results['totalPages']:
+                break
+            page += 1
+    return short_names
+
+def refined(justgiving_search, query, depth=1):
+    """The queries the default crawl downloads for `query`, as get_all_data refines them."""
+    queries = [(query, depth)]
+    pages = justgiving_search.probe_total_pages(query)
+    if pages >= justgiving_search.MAX_PAGES_THRESHOLD and depth < justgiving_search.MAX_RECURSION_DEPTH:
+        for child in justgiving_search.refine_query(query):
+            queries += refined(justgiving_search, child, depth + 1)
+    return queries
+
+def test_planned_queries_cover_the_direct_crawl(justgiving_search, fake_api):
+    roots = [(letter, 1) for letter in justgiving_search.LETTERS]
+    planned = justgiving_search.plan_queries(roots)
+
+    assert any(depth > 1 for _, depth in planned)  # the plan did split some queries
+    for root, depth in roots:
+        # Everything the direct crawl of a root downloads, the planned queries under it download too
+        under_root = [(query, d) for query, d in planned if query.startswith(root)]
+        assert downloaded(justgiving_search, under_root) >= downloaded(justgiving_search, [(root, depth)])
+
+def test_split_queries_are_not_downloaded(justgiving_search, fake_api):
+    planned = justgiving_search.plan_queries([('a', 1)])
+
+    assert ('a', 1) not in planned
+    assert any(query.startswith('a-') for query, _ in planned)  # names where 'a' is followed by a hyphen
+    assert downloaded(justgiving_search, planned) == set(fake_api.find_matches('a'))
+
+def test_plan_costs_fewer_requests_than_refining(justgiving_search, fake_api):
+    roots = [(letter, 1) for letter in justgiving_search.LETTERS]
+    refine_queries = [q for root, depth in roots for q in refined(justgiving_search, root, depth)]
+    fake_api.requests = 0
+    refine_names = downloaded(justgiving_search, refine_queries)
+    refine_requests = fake_api.requests
+
+    fake_api.requests = 0
+    plan_names = downloaded(justgiving_search, justgiving_search.plan_queries(roots))
+
+    assert plan_names == set(fake_api.short_names) >= refine_names
+    assert fake_api.requests < refine_requests  # probes included
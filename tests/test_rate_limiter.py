@@ -0,0 +1,100 @@
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+class FakeSharedThrottle:
+    """In-memory stand-in for the 'rate_limit_state' row that SharedThrottle reads and writes."""
+    def __init__(self):
+        self.rate = None
+        self.paused_until = 0.0
+        self.episode = 0
+
+    def publish(self, pause, rate=None):
+        self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        if rate is not None:
+            self.rate = rate
+            self.episode += 1
+        return self.episode
+
+    def read(self):
+        return self.rate, max(0.0, self.paused_until - time.monotonic()), self.episode
+
+@pytest.fixture
+def limiter_class(justgiving_search, monkeypatch):
+    monkeypatch.setattr(justgiving_search, 'RATE_SYNC_SECONDS', 0.0)  # sync on every acquire
+    return justgiving_search.RateLimiter
+
+def test_throttling_cuts_the_rate_once_per_episode(justgiving_search, limiter_class):
+    limiter = limiter_class(rate=8, min_rate=1)
+    limiter.on_throttle(0)
+    limiter.on_throttle(0)  # another request throttled by the same episode
+    assert limiter.rate == 8 * justgiving_search.RATE_DECREASE
+
+    limiter.last_decrease -= 1  # a later episode
+    limiter.on_throttle(0)
+    limiter.last_decrease -= 1
+    limiter.on_throttle(0)
+    assert limiter.rate == 1  # not below min_rate
+
+def test_success_adds_the_rate_back_up_to_the_budget(justgiving_search, limiter_class):
+    limiter = limiter_class(rate=2, min_rate=1)
+    limiter.on_throttle(0)
+    limiter.on_success()
+    assert limiter.rate == 1 + justgiving_search.RATE_INCREASE
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.rate == 2
+
+def test_throttle_pauses_every_caller(limiter_class):
+    limiter = limiter_class(rate=100)
+    limiter.on_throttle(0.2)
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started >= 0.2
+
+@pytest.mark.parametrize('value, expected', [('7', 7.0), ('0.5', 0.5), ('-3', 0.0), (None, None), ('soon', None)])
+def test_parse_retry_after_seconds(justgiving_search, value, expected):
+    assert justgiving_search.parse_retry_after(value) == expected
+
+def test_parse_retry_after_http_date(justgiving_search):
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < justgiving_search.parse_retry_after(format_datetime(retry_at, usegmt=True)) <= 30
+
+def test_requests_honour_retry_after(justgiving_search, limiter_class, monkeypatch):
+    limiter = limiter_class(rate=100)
+    pauses = []
+    on_throttle = limiter.on_throttle
+    monkeypatch.setattr(limiter, 'on_throttle', lambda pause: (pauses.append(pause), on_throttle(pause)))
+    monkeypatch.setattr(justgiving_search, 'rate_limiter', limiter)
+
+    responses = []
+    for status, headers in [(429, {'Retry-After': '0.1'}), (200, {})]:
+        response = requests.Response()
+        response.status_code, response._content = status, b'{}'
+        response.headers.update(headers)
+        responses.append(response)
+    monkeypatch.setattr(justgiving_search.http_session.session, 'get', lambda url, **kwargs: responses.pop(0))
+
+    assert justgiving_search.request_with_retries('http://api.test/v1/fundraising/pages/x').status_code == 200
+    assert pauses == [0.1]
+
+def test_throttling_reaches_other_processes(justgiving_search, limiter_class):
+    shared = FakeSharedThrottle()
+    shared.publish(0, rate=1.0)  # a cut left behind by an earlier run
+    first = limiter_class(rate=8, min_rate=1, shared=shared)
+    second = limiter_class(rate=8, min_rate=1, shared=shared)
+    first.acquire(), second.acquire()
+    assert first.rate == second.rate == 8  # old cuts are not adopted
+
+    first.on_throttle(0.2)
+    second.sync()
+    assert second.rate == first.rate == 8 * justgiving_search.RATE_DECREASE
+    second.on_throttle(0)  # its own 429 from the same episode
+    assert second.rate == 8 * justgiving_search.RATE_DECREASE
+
+    started = time.monotonic()
+    second.acquire()
+    assert time.monotonic() - started >= 0.15  # paused by the other process's 429
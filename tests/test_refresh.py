@@ -0,0 +1,87 @@
+import json
+from contextlib import nullcontext
+
+import pytest
+import requests
+
+@pytest.fixture
+def store(justgiving_search, monkeypatch):
+    """
+    An in-memory 'crowdfunding' table of stale pages, name -> content hash. Pages leave it
+    when they are touched or rewritten, as they would stop being stale.
+    """
+    pages = {f'page-{i}': justgiving_search.content_hash({'id': i}) for i in range(12)}
+    written = {'touched': [], 'changed': []}
+
+    def get_stale_pages(max_age_hours, limit, exclude=()):
+        return [(sn, h) for sn, h in pages.items() if sn not in exclude][:limit]
+
+    def touch_pages(short_names):
+        written['touched'] += short_names
+        for sn in short_names:
+            del pages[sn]
+
+    def upsert_changed_pages(rows):
+        written['changed'] += [sn for sn, _ in rows]
+        for sn, _ in rows:
+            del pages[sn]
+
+    monkeypatch.setattr(justgiving_search, 'get_stale_pages', get_stale_pages)
+    monkeypatch.setattr(justgiving_search, 'touch_pages', touch_pages)
+    monkeypatch.setattr(justgiving_search, 'upsert_changed_pages', upsert_changed_pages)
+    monkeypatch.setattr(justgiving_search, 'transaction', nullcontext)
+    monkeypatch.setattr(justgiving_search, 'REFRESH_BATCH_SIZE', 5)
+    return pages, written
+
+def test_failed_fetches_are_not_marked_fresh(justgiving_search, store, monkeypatch):
+    pages, written = store
+    monkeypatch.setattr(justgiving_search, 'fetch_page_details', lambda sn, fresh=False: (None, None))
+
+    justgiving_search.refresh_pages()  # returns although no page could be fetched
+
+    assert written == {'touched': [], 'changed': []}
+    assert len(pages) == 12
+
+def test_only_matching_and_missing_pages_are_touched(justgiving_search, store, monkeypatch):
+    pages, written = store
+
+    def fetch_page_details(sn, fresh=False):
+        i = int(sn.split('-')[1])
+        if i % 4 == 0:
+            return 200, {'id': i}           # unchanged
+        if i % 4 == 1:
+            return 200, {'id': i, 'new': 1}  # changed
+        if i % 4 == 2:
+            return 404, None
+        return 503, None
+
+    monkeypatch.setattr(justgiving_search, 'fetch_page_details', fetch_page_details)
+    justgiving_search.refresh_pages()
+
+    assert sorted(written['touched']) == sorted(f'page-{i}' for i in range(12) if i % 4 in (0, 2))
+    assert sorted(written['changed']) == sorted(f'page-{i}' for i in range(12) if i % 4 == 1)
+    assert sorted(pages) == sorted(f'page-{i}' for i in range(12) if i % 4 == 3)
+
+def api_response(status, payload=None):
+    """A real requests.Response, as the HTTP session would return it."""
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(payload).encode('utf-8') if payload is not None else b'Not found'
+    return response
+
+def test_live_404_is_a_status_not_a_missing_response(justgiving_search, monkeypatch):
+    monkeypatch.setattr(justgiving_search.http_session.session, 'get', lambda url, **kwargs: api_response(404))
+    assert justgiving_search.fetch_page_details('no-such-page', fresh=True) == (404, None)
+
+def test_deleted_pages_are_touched_through_the_http_path(justgiving_search, store, monkeypatch):
+    pages, written = store
+
+    def get(url, **kwargs):
+        i = int(url.rsplit('-', 1)[1])
+        return api_response(404) if i % 2 else api_response(200, {'id': i})
+
+    monkeypatch.setattr(justgiving_search.http_session.session, 'get', get)
+    justgiving_search.refresh_pages()
+
+    assert sorted(written['touched']) == sorted(f'page-{i}' for i in range(12))
+    assert written['changed'] == [] and pages == {}
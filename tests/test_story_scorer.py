@@ -0,0 +1,57 @@
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+import http.server
+
+import pytest
+
+from sentiment_analysis import build_keyword_maps
+from story_scorer import ScoringHandler, StoryScorer, serve_stdin
+
+STORY = "Running the marathon for my local community"
+
+@pytest.fixture(scope='module')
+def scorer():
+    # The automaton matcher needs no NLTK data
+    feature_names = sorted(build_keyword_maps()[0])
+    return StoryScorer(feature_names, [1] * len(feature_names), 10, matcher='automaton')
+
+def test_stdin_reports_bad_lines_and_keeps_going(scorer, monkeypatch, capsys):
+    lines = ['{not json', '[1, 2]', '{"story": 5}', json.dumps({'short_name': 'abc', 'story': STORY})]
+    monkeypatch.setattr('sys.stdin', io.StringIO('\n'.join(lines) + '\n'))
+    serve_stdin(scorer)
+
+    output = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [list(result) for result in output[:3]] == [['error']] * 3
+    assert output[3]['short_name'] == 'abc'
+    assert output[3]['categories'] == scorer.score(STORY)['categories']
+
+@pytest.fixture(scope='module')
+def server(scorer):
+    handler = type('Handler', (ScoringHandler,), {'scorer': scorer})
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}/score'
+    server.shutdown()
+
+def post(url, body):
+    request = urllib.request.Request(url, data=body.encode('utf-8'), method='POST')
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, None
+
+@pytest.mark.parametrize('body', ['{not json', '[1, 2]', '"story"', '{"story": ["a"]}',
+                                  '{"stories": "abc"}', '{"stories": [1, 2]}', '{"stories": [{"story": 5}]}'])
+def test_http_rejects_bad_requests(server, body):
+    assert post(server, body) == (400, None)
+
+def test_http_scores_good_requests(server, scorer):
+    status, result = post(server, json.dumps({'story': STORY}))
+    assert status == 200 and result == json.loads(json.dumps(scorer.score(STORY)))
+
+    status, results = post(server, json.dumps({'stories': [{'short_name': 'a', 'story': STORY}, {}]}))
+    assert status == 200 and [r.get('short_name') for r in results] == ['a', None]
@@ -0,0 +1,25 @@
+import pytest
+
+import sentiment_analysis
+from compare_tokenizers import EDGE_CASES
+
+@pytest.fixture(scope='module')
+def tokenizers():
+    try:
+        return sentiment_analysis.load_tokenizer('nltk'), sentiment_analysis.load_tokenizer('fast')
+    except SystemExit as e:
+        pytest.skip(str(e))
+
+@pytest.mark.parametrize('text', EDGE_CASES)
+def test_fast_matches_nltk_on_edge_cases(tokenizers, text):
+    nltk, fast = tokenizers
+    assert fast(text) == nltk(text)
+
+def test_abbreviations_and_initials_are_dropped(tokenizers, monkeypatch):
+    nltk, fast = tokenizers
+    monkeypatch.setattr(sentiment_analysis, 'punkt_abbreviations', lambda: frozenset({'mr', 'st'}))
+    sentiment_analysis.fast_split_re.cache_clear()
+    try:
+        assert fast("mr. j. smith ran to st. john's, then home mr. 5 j. 5 st.") == 'smith ran john home j st'
+    finally:
+        sentiment_analysis.fast_split_re.cache_clear()
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from sentiment_analysis import top_k_rows
+
+def reference_top_k(column, k):
+    """Stable full sort: highest scores first, equal scores in row order."""
+    rows = [i for i in sorted(range(len(column)), key=lambda i: -column[i]) if column[i] > 0]
+    return rows[:k]
+
+def test_ties_with_the_kth_score_keep_row_order():
+    column = np.random.default_rng(0).choice([0, .5, 1], size=1000)
+    assert top_k_rows(column[:, None], 2)[0].tolist() == reference_top_k(column, 2)
+
+@pytest.mark.parametrize('k', [0, 1, 2, 5, 50])
+def test_matches_a_stable_full_sort(k):
+    scores = np.random.default_rng(k).choice([0, .25, .5, .75, 1], size=(200, 4))
+    expected = [reference_top_k(column, k) for column in scores.T]
+    assert [rows.tolist() for rows in top_k_rows(scores, k)] == expected
+
+def test_fewer_positive_scores_than_k():
+    scores = np.array([[0, 1], [2, 0], [0, 0]])
+    assert [rows.tolist() for rows in top_k_rows(scores, 5)] == [[1], [0]]
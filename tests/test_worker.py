@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+class FakeLeaseConnection:
+    """A connection whose UPDATE renews the lease while `held` is true."""
+    def __init__(self):
+        self.held = True
+        self.renewals = 0
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, sql, params):
+        assert 'lease_expires' in sql and params[1:] == ('a', 'worker-1')
+        self.renewals += 1
+        self.rowcount = 1 if self.held else 0
+
+@pytest.fixture
+def worker(justgiving_search, monkeypatch):
+    monkeypatch.setattr(justgiving_search, 'worker_id', 'worker-1')
+    monkeypatch.setattr(justgiving_search, 'HEARTBEAT_SECONDS', 0.01)
+    return justgiving_search
+
+def test_lease_is_renewed_while_a_page_is_in_progress(worker):
+    connection = FakeLeaseConnection()
+    with worker.LeaseHeartbeat('a', connection):
+        time.sleep(0.2)  # one slow search page, no page boundary
+    assert connection.renewals >= 5
+
+    renewals = connection.renewals
+    time.sleep(0.05)
+    assert connection.renewals == renewals  # stopped with the claim
+
+def test_heartbeat_stops_once_the_lease_is_lost(worker):
+    connection = FakeLeaseConnection()
+    connection.held = False
+    with worker.LeaseHeartbeat('a', connection) as heartbeat:
+        heartbeat.thread.join(1)
+        assert not heartbeat.thread.is_alive()
+    assert connection.renewals == 1
@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+
+import pytest
+
+class FakeCursor:
+    """Answers the dedup query from the `stored` short names."""
+    def __init__(self, stored):
+        self.stored = stored
+
+    def execute(self, sql, params):
+        self.rows = [(sn,) for sn in params[0] if sn in self.stored]
+
+    def fetchall(self):
+        return self.rows
+
+@pytest.fixture
+def db(justgiving_search, monkeypatch):
+    """Record the buffer's writes as events; committed rows land in `stored`."""
+    events, stored = [], set()
+
+    @contextmanager
+    def transaction():
+        events.append('begin')
+        try:
+            yield
+        except Exception:
+            events.append('rollback')
+            raise
+        events.append('commit')
+
+    def save_batch_to_db(rows):
+        if any(details is None for _, details in rows):
+            raise RuntimeError("write failed")
+        events.append(('save', [sn for sn, _ in rows]))
+        stored.update(sn for sn, _ in rows)
+
+    monkeypatch.setattr(justgiving_search, 'transaction', transaction)
+    monkeypatch.setattr(justgiving_search, 'save_batch_to_db', save_batch_to_db)
+    monkeypatch.setattr(justgiving_search, 'update_query_state',
+                        lambda query, depth, current_page=None, fully_processed=None:
+                        events.append(('state', current_page, fully_processed)))
+    monkeypatch.setattr(justgiving_search, 'cursor', FakeCursor(stored))
+    monkeypatch.setattr(justgiving_search, 'FLUSH_EVERY_PAGES', 2)
+    monkeypatch.setattr(justgiving_search, 'pending_short_names', set())
+    return events, stored
+
+def test_rows_commit_with_the_state_advance(justgiving_search, db):
+    events, stored = db
+    buffer = justgiving_search.PageWriteBuffer('a', 1)
+    buffer.add('x', {'id': 1})
+    buffer.page_done(2)
+    assert events == []  # held back until FLUSH_EVERY_PAGES pages are done
+
+    buffer.add('y', {'id': 2})
+    buffer.page_done(3)
+    assert events == ['begin', ('save', ['x', 'y']), ('state', 3, None), 'commit']
+
+    buffer.flush(fully_processed=True)
+    assert events[-3:] == ['begin', ('state', None, True), 'commit']
+
+def test_buffered_pages_are_not_fetched_again(justgiving_search, db):
+    events, stored = db
+    buffer = justgiving_search.PageWriteBuffer('a', 1)
+    buffer.add('x', {'id': 1})
+    # A sibling query sees 'x' although it is not in the table yet
+    assert justgiving_search.filter_new_short_names(['x', 'y']) == ['y']
+
+    buffer.flush()
+    assert justgiving_search.pending_short_names == set()
+    assert justgiving_search.filter_new_short_names(['x', 'y']) == ['y']
+
+def test_rolled_back_pages_can_be_fetched_again(justgiving_search, db):
+    events, stored = db
+    buffer = justgiving_search.PageWriteBuffer('a', 1)
+    buffer.add('x', None)  # makes the write fail
+    buffer.page_done(2)
+    with pytest.raises(RuntimeError):
+        buffer.page_done(3)
+
+    assert events == ['begin', 'rollback']  # the state was not advanced either
+    assert justgiving_search.filter_new_short_names(['x']) == ['x']
+
+def test_lost_lease_releases_the_buffered_pages(justgiving_search, db, monkeypatch):
+    def renew_lease(query):
+        raise justgiving_search.LeaseLost(query)
+
+    monkeypatch.setattr(justgiving_search, 'worker_id', 'worker-1')
+    monkeypatch.setattr(justgiving_search, 'renew_lease', renew_lease)
+    buffer = justgiving_search.PageWriteBuffer('a', 1)
+    buffer.add('x', {'id': 1})
+    with pytest.raises(justgiving_search.LeaseLost):
+        buffer.page_done(2)
+    assert justgiving_search.filter_new_short_names(['x']) == ['x']